@@ -0,0 +1,78 @@
+"""
+Load test: `AsyncRater` under a burst of concurrent in-process clients.
+
+Each client awaits `rate_match` for its share of a synthetic period's
+matches, one after another, while a ticker task measures how late the
+event loop wakes it up. Reports throughput, batch sizes, per-match latency
+and the worst event loop lag, with no network involved.
+
+Usage: python benchmarks/bench_async.py [--clients C] [--matches M]
+"""
+import argparse
+import asyncio
+import time
+
+from common import notebook_period
+
+from glickoTR import Glicko2
+from glickoTR_async import AsyncRater, MAX_BATCH, MAX_DELAY
+
+TICK = 0.001
+
+
+async def _ticker(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(TICK)
+        lags.append(loop.time() - start - TICK)
+
+
+async def _client(rater, matches, latencies):
+    for match in matches:
+        start = time.perf_counter()
+        await rater.rate_match(*match)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(clients=200, matches=20000, players=5000, max_batch=MAX_BATCH,
+              max_delay=MAX_DELAY):
+    """Returns a dict of summary numbers for one burst."""
+    env = Glicko2(tau=0.5)
+    ratings, rows = notebook_period(env, players, matches)
+    latencies, lags = [], []
+    stop = asyncio.Event()
+    ticker = asyncio.ensure_future(_ticker(lags, stop))
+    start = time.perf_counter()
+    async with AsyncRater(env, dict(enumerate(ratings)), max_batch, max_delay) as rater:
+        await asyncio.gather(*[_client(rater, rows[i::clients], latencies)
+                               for i in range(clients)])
+    seconds = time.perf_counter() - start
+    stop.set()
+    await ticker
+    latencies.sort()
+    return {
+        'matches_per_second': len(rows) / seconds,
+        'mean_batch': rater.matches / rater.batches,
+        'p50_ms': latencies[len(latencies) // 2] * 1e3,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1e3,
+        'max_loop_lag_ms': max(lags) * 1e3 if lags else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--matches', type=int, default=20000)
+    parser.add_argument('--max_batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--max_delay', type=float, default=MAX_DELAY)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.clients, args.matches, max_batch=args.max_batch,
+                              max_delay=args.max_delay))
+    for name, value in results.items():
+        print('%-20s %10.2f' % (name, value))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Scaling benchmark: `rate_period_parallel` with 1, 2, 4 and 8 workers.
+
+Rates one synthetic period (random pairings, 90% completed / 10% retired,
+as in the simulation notebook) and reports wall time and speedup over a
+single worker, so batch nodes can be sized.
+
+Usage: python benchmarks/bench_parallel.py [--players N] [--matches M]
+"""
+import argparse
+import os
+import time
+
+from common import notebook_period, series_by_player
+
+from glickoTR import Glicko2
+from glickoTR_parallel import rate_period_parallel
+
+
+def run(players=100000, matches=500000, workers=(1, 2, 4, 8)):
+    """Returns [(workers, seconds)] for one period at each worker count."""
+    env = Glicko2(tau=0.5)
+    ratings, rows = notebook_period(env, players, matches)
+    series = series_by_player(rows)
+    results = []
+    for count in workers:
+        start = time.perf_counter()
+        rate_period_parallel(env, ratings, series, workers=count)
+        results.append((count, time.perf_counter() - start))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=100000)
+    parser.add_argument('--matches', type=int, default=500000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print('%d players, %d matches, %d CPUs' % (args.players, args.matches, os.cpu_count()))
+    results = run(args.players, args.matches, args.workers)
+    single = results[0][1]
+    for count, seconds in results:
+        print('%2d workers  %8.2f s  (%.2fx)' % (count, seconds, single / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Microbenchmark: per-match latency of single-match updates.
+
+Compares four ways of rating one tennis match:
+
+* `reference`: the original implementation (benchmarks/reference.py), two
+  Rating-object `rate` calls with the full volatility bracket search
+* two calls of the current `rate`, one per player
+* `rate_tennis_match` (Rating in/out, one shared pass)
+* `rate_tennis_match_scaled` (stays on the internal Glicko-2 scale)
+
+Speedups are reported against `reference`.
+
+Usage: python benchmarks/bench_single_match.py [--number N]
+"""
+import argparse
+import timeit
+
+import common  # noqa: F401 (puts the repository on sys.path)
+from reference import ReferenceGlicko2
+
+from glickoTR import Glicko2, COMPLETED
+
+
+def run(number=20000, repeat=5):
+    """Returns {case name: best per-match latency in microseconds}."""
+    env = Glicko2(tau=0.5)
+    reference = ReferenceGlicko2(tau=0.5)
+    rating1 = env.create_rating(1550, 120, 0.06)
+    rating2 = env.create_rating(1480, 90, 0.05)
+    scaled1, scaled2 = env.to_scaled(rating1), env.to_scaled(rating2)
+
+    expected = reference.rate_tennis_match(rating1, rating2, 12, 7, COMPLETED)
+    got = env.rate_tennis_match(rating1, rating2, 12, 7, COMPLETED)
+    for a, b in zip(expected, got):
+        if (a.mu, a.phi, a.sigma) != (b.mu, b.phi, b.sigma):
+            raise AssertionError('rate_tennis_match differs from the reference')
+
+    def two_rate_calls():
+        env.rate(rating1, [(12, 7, rating2, COMPLETED)])
+        env.rate(rating2, [(7, 12, rating1, COMPLETED)])
+
+    cases = [
+        ('reference', lambda: reference.rate_tennis_match(rating1, rating2, 12, 7, COMPLETED)),
+        ('rate x2', two_rate_calls),
+        ('rate_tennis_match', lambda: env.rate_tennis_match(rating1, rating2, 12, 7, COMPLETED)),
+        ('rate_tennis_match_scaled',
+         lambda: env.rate_tennis_match_scaled(scaled1, scaled2, 12, 7, COMPLETED)),
+    ]
+    results = {}
+    for name, func in cases:
+        # The reference is slow; fewer calls give the same precision
+        calls = number // 10 if name == 'reference' else number
+        best = min(timeit.repeat(func, number=calls, repeat=repeat))
+        results[name] = best / calls * 1e6
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000, help="Matches per timing run")
+    args = parser.parse_args()
+
+    results = run(args.number)
+    baseline = results['reference']
+    for name, usec in results.items():
+        print('%-26s %8.2f us/match  (%.2fx)' % (name, usec, baseline / usec))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Shared helpers for the benchmark scripts: import path setup, timing and
+synthetic data generated like the simulation notebook.
+"""
+import math
+import os
+import random
+import sys
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from glickoTR import COMPLETED, RETIRED  # noqa: E402
+
+
+def best_time(func, number, repeat=5):
+    """Best-of-`repeat` seconds per call of `func`."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def simulate_game_scores(p1_wins, status, rng):
+    """The notebook's `simulate_game_scores`, drawing from `rng`."""
+    if status == COMPLETED:
+        total_games = rng.randint(12, 30)
+    else:
+        total_games = rng.randint(1, 17)
+    win_share = rng.uniform(0.501, 0.95)
+    winner = math.ceil(total_games * win_share)
+    loser = total_games - winner
+    if winner <= loser:
+        winner = loser + 1
+    loser = max(0, total_games - winner)
+    return (winner, loser) if p1_wins else (loser, winner)
+
+
+def notebook_period(env, players, matches, seed=0):
+    """One synthetic period, generated like the notebook's simulation:
+    random pairings, winners drawn from the expected score (deterministic
+    beyond a 350 point gap), 90% completed / 10% retired.
+
+    Returns:
+        tuple: (ratings, match_rows) where ratings is a list of start-of-period
+        Ratings indexed by player id and match_rows a list of
+        (player1, player2, games1, games2, status) tuples.
+    """
+    rng = random.Random(seed)
+    ratings = [env.create_rating(rng.gauss(1500, 200), rng.uniform(50, 350))
+               for _ in range(players)]
+    scaled = [env.scale_down(rating) for rating in ratings]
+    rows = []
+    for _ in range(matches):
+        p1, p2 = rng.sample(range(players), 2)
+        mu_diff = ratings[p1].mu - ratings[p2].mu
+        if mu_diff > 350.0:
+            p1_wins = True
+        elif mu_diff < -350.0:
+            p1_wins = False
+        else:
+            impact = env.reduce_impact(scaled[p2])
+            p1_wins = rng.random() < env.expect_score(scaled[p1], scaled[p2], impact)
+        status = COMPLETED if rng.random() < 0.9 else RETIRED
+        games1, games2 = simulate_game_scores(p1_wins, status, rng)
+        rows.append((p1, p2, games1, games2, status))
+    return ratings, rows
+
+
+def series_by_player(rows, ratings=None):
+    """Groups match rows into per-player series. Opponents are Ratings from
+    `ratings` if given, otherwise opponent ids."""
+    series = {}
+    for p1, p2, games1, games2, status in rows:
+        opp1 = ratings[p2] if ratings is not None else p2
+        opp2 = ratings[p1] if ratings is not None else p1
+        series.setdefault(p1, []).append((games1, games2, opp1, status))
+        series.setdefault(p2, []).append((games2, games1, opp2, status))
+    return series
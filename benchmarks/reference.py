@@ -0,0 +1,102 @@
+"""
+Reference implementation of the single-match path as it was before the
+internal-scale rewrite, kept to measure speedups against.
+
+`ReferenceGlicko2.rate` is the original `Glicko2.rate`: every rating goes
+through scale_down/create_rating/scale_up as a Rating object, g(phi) and E
+are method calls per match, and the volatility bracket search evaluates f
+up to max_k times (no MAX_TAU_FULL_BRACKET shortcut). `rate_tennis_match`
+is two such `rate` calls. Results equal the current engine's.
+"""
+import math
+
+import common  # noqa: F401 (puts the repository on sys.path)
+
+from glickoTR import Glicko2
+
+
+class ReferenceGlicko2(Glicko2):
+    """Glicko2 with the original per-player update code paths."""
+
+    def reduce_impact(self, rating):
+        return 1. / math.sqrt(1 + (3 * rating.phi ** 2) / (math.pi ** 2))
+
+    def expect_score(self, rating, other_rating, impact):
+        score = 1. / (1 + math.exp(-impact * (rating.mu - other_rating.mu)))
+        clamp_epsilon = 1e-1
+        return max(clamp_epsilon, min(score, 1.0 - clamp_epsilon))
+
+    def determine_sigma(self, rating, difference, variance):
+        phi = rating.phi
+        difference_squared = difference ** 2
+        alpha = math.log(rating.sigma ** 2)
+
+        def f(x):
+            exp_x = math.exp(x)
+            tmp = phi ** 2 + variance + exp_x
+            if tmp < 1e-15:
+                return -1.0 / (self.tau**2)
+            a = exp_x * (difference_squared - phi**2 - variance - exp_x) / (2 * tmp ** 2)
+            b = (x - alpha) / (self.tau ** 2)
+            return a - b
+
+        a = alpha
+        if difference_squared > phi ** 2 + variance:
+            b = math.log(difference_squared - phi ** 2 - variance)
+        else:
+            k = 1
+            max_k = 100
+            while k < max_k and f(alpha - k * math.sqrt(self.tau ** 2)) >= 0:
+                k += 1
+            b = alpha - k * math.sqrt(self.tau ** 2)
+        f_a, f_b = f(a), f(b)
+        if f_a * f_b >= 0:
+            return rating.sigma
+        while abs(b - a) > self.epsilon:
+            c = a + (a - b) * f_a / (f_b - f_a)
+            f_c = f(c)
+            if f_c * f_b < 0:
+                a, f_a = b, f_b
+            else:
+                f_a *= f_b / (f_b + f_c)
+            b, f_b = c, f_c
+            if abs(f_b - f_a) < self.epsilon:
+                break
+        return math.exp(b / 2)
+
+    def rate(self, rating, series):
+        rating_g2 = self.scale_down(rating)
+        variance_inv = 0
+        difference = 0
+        if not series:
+            phi_star = math.sqrt(rating_g2.phi ** 2 + rating_g2.sigma ** 2)
+            return self.scale_up(self.create_rating(rating_g2.mu, phi_star, rating_g2.sigma))
+        for player_games, opp_games, other_rating_orig, status in series:
+            match_weight = self._calculate_match_weight(status, player_games, opp_games)
+            if match_weight <= 0:
+                continue
+            other_rating_g2 = self.scale_down(other_rating_orig)
+            impact = self.reduce_impact(other_rating_g2)
+            expected_score = self.expect_score(rating_g2, other_rating_g2, impact)
+            total_games = player_games + opp_games
+            if total_games <= 0:
+                actual_score = 0.5
+            else:
+                actual_score = float(player_games) / total_games
+            variance_inv += match_weight * (impact ** 2 * expected_score * (1 - expected_score))
+            difference += match_weight * (impact * (actual_score - expected_score))
+        if variance_inv < self.epsilon:
+            phi_star = math.sqrt(rating_g2.phi ** 2 + rating_g2.sigma ** 2)
+            return self.scale_up(self.create_rating(rating_g2.mu, phi_star, rating_g2.sigma))
+        variance = 1. / variance_inv
+        difference /= variance_inv
+        new_sigma = self.determine_sigma(rating_g2, difference, variance)
+        phi_star = math.sqrt(rating_g2.phi ** 2 + new_sigma ** 2)
+        new_phi = 1. / math.sqrt(1. / phi_star ** 2 + 1. / variance)
+        new_mu = rating_g2.mu + new_phi ** 2 * difference
+        return self.scale_up(self.create_rating(new_mu, new_phi, new_sigma))
+
+    def rate_tennis_match(self, rating1, rating2, games1, games2, status):
+        new_rating1 = self.rate(rating1, [(games1, games2, rating2, status)])
+        new_rating2 = self.rate(rating2, [(games2, games1, rating1, status)])
+        return new_rating1, new_rating2
@@ -0,0 +1,683 @@
+"""
+Benchmark suite for the rating engine hot paths, with regression gates.
+
+Commands:
+
+    python benchmarks/suite.py run [--output results.json] [--quick]
+        Times every benchmark and writes machine-readable results. The
+        equivalence checks run first; the run fails if any of them fails.
+
+    python benchmarks/suite.py compare BASELINE CURRENT [--threshold 0.15]
+        Flags every benchmark that got slower than BASELINE by more than
+        the threshold (a fraction) and exits non-zero if any did.
+
+    python benchmarks/suite.py check
+        Only runs the numerical equivalence checks: every fast path against
+        the per-player `Glicko2.rate` and scalar volatility solver, and the
+        atomic oracle script against the four scenario files.
+
+A baseline is just a results file from `run` kept for later comparison,
+e.g. `run --output benchmarks/baseline.json` on the machine that gates.
+No baseline is shipped: timings only compare on the same machine, so each
+gating machine records its own (`run` stores the platform and versions with it).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from common import ROOT, best_time, notebook_period, series_by_player
+
+from glickoTR import Glicko2, Rating, COMPLETED, RETIRED, WALKOVER
+
+# Default slowdown (fraction) tolerated by `compare`
+THRESHOLD = 0.15
+
+# Synthetic period sizes, with the notebook's 10 matches per player
+PERIOD_SIZES = (1000, 10000, 100000)
+QUICK_PERIOD_SIZES = (1000,)
+MATCHES_PER_PLAYER = 10
+
+# The four scenarios from run_tests.bat: (expected file, player 1, player 2,
+# games 1, games 2, status)
+SCENARIOS = (
+    ('scenario1_expected.json', (1500.0, 350.0, 0.06), (1500.0, 350.0, 0.06), 13, 8, 'completed'),
+    ('scenario2_expected.json', (1400.0, 150.0, 0.05), (1700.0, 100.0, 0.04), 13, 10, 'completed'),
+    ('scenario3_expected.json', (1600.0, 80.0, 0.06), (1500.0, 120.0, 0.06), 7, 7, 'retired'),
+    ('scenario4_expected.json', (1550.0, 400.0, 0.06), (1450.0, 380.0, 0.06), 12, 1, 'completed'),
+)
+
+# Relative tolerance for the scenario files (they were generated on another
+# platform, whose libm differs in the last ulp)
+SCENARIO_TOLERANCE = 1e-12
+
+
+def _relative_error(got, expected):
+    return abs(got - expected) / max(abs(expected), 1e-300)
+
+
+def _same_rating(a, b, tolerance=0.0):
+    return all(_relative_error(x, y) <= tolerance
+               for x, y in ((a.mu, b.mu), (a.phi, b.phi), (a.sigma, b.sigma)))
+
+
+def _random_rating(rng):
+    return Rating(rng.gauss(1500, 300), rng.uniform(30, 400), rng.uniform(0.03, 0.09))
+
+
+# --- Equivalence checks -------------------------------------------------------
+# Each check returns None on success or a short failure description.
+
+def check_scenarios():
+    # The files are the outputs of glickoTR_atomic_test, the cross-language
+    # oracle, whose update differs from Glicko2.rate (the volatility solve
+    # gets the unweighted, clamped variance). Glicko2.rate_tennis_match does
+    # not reproduce them, so they only guard the primitives the oracle
+    # shares with the engine: scale_down/scale_up, reduce_impact,
+    # expect_score, determine_sigma and the match weight.
+    import glickoTR_atomic_test as atomic
+    engine = atomic.create_engine()
+    for name, player, opponent, games1, games2, status in SCENARIOS:
+        with open(os.path.join(ROOT, name)) as f:
+            expected = json.load(f)
+        result = atomic.calculate_single_match_update(
+            Rating(*player), Rating(*opponent), games1, games2, status, engine)
+        for side in ('player_new', 'opponent_new'):
+            for field in ('mu', 'phi', 'sigma'):
+                error = _relative_error(result[side][field], expected[side][field])
+                if error > SCENARIO_TOLERANCE:
+                    return '%s %s.%s off by %.3g' % (name, side, field, error)
+
+
+def check_rate_tennis_match():
+    env = Glicko2(tau=0.5)
+    rng = random.Random(1)
+    for _ in range(2000):
+        rating1, rating2 = _random_rating(rng), _random_rating(rng)
+        games1, games2 = rng.randint(0, 13), rng.randint(0, 13)
+        status = rng.choice((COMPLETED, RETIRED, WALKOVER))
+        new1, new2 = env.rate_tennis_match(rating1, rating2, games1, games2, status)
+        scaled1, scaled2 = env.rate_tennis_match_scaled(
+            env.to_scaled(rating1), env.to_scaled(rating2), games1, games2, status)
+        expected1 = env.rate(rating1, [(games1, games2, rating2, status)])
+        expected2 = env.rate(rating2, [(games2, games1, rating1, status)])
+        if not (_same_rating(new1, expected1) and _same_rating(new2, expected2)):
+            return 'rate_tennis_match differs from rate'
+        if not (_same_rating(env.from_scaled(scaled1), expected1) and
+                _same_rating(env.from_scaled(scaled2), expected2)):
+            return 'rate_tennis_match_scaled differs from rate'
+
+
+def check_rate_period():
+    from glickoTR_batch import RATE_PERIOD_TOLERANCE, status_codes
+    import numpy as np
+    env = Glicko2(tau=0.5)
+    ratings, rows = notebook_period(env, 1000, 1000 * MATCHES_PER_PLAYER, seed=2)
+    columns = list(zip(*rows))
+    new = env.rate_period(
+        tuple(np.array([getattr(r, field) for r in ratings]) for field in ('mu', 'phi', 'sigma')),
+        tuple(np.array(column) for column in columns[:4]) + (status_codes(columns[4]),))
+    series = series_by_player(rows, ratings)
+    for player_id, rating in enumerate(ratings):
+        expected = env.rate(rating, series.get(player_id, []))
+        got = Rating(new.mu[player_id], new.phi[player_id], new.sigma[player_id])
+        if not _same_rating(got, expected, RATE_PERIOD_TOLERANCE):
+            return 'rate_period differs from rate for player %d' % player_id
+
+
+def check_determine_sigma():
+    from glickoTR_batch import determine_sigma
+    import numpy as np
+    rng = np.random.default_rng(3)
+    n = 5000
+    phi, sigma = rng.uniform(0.05, 2.5, n), rng.uniform(0.02, 0.12, n)
+    difference, variance = rng.normal(0, 2, n), rng.uniform(0.2, 30, n)
+    for tau in (0.5, 2.0):
+        env = Glicko2(tau=tau)
+        batch = determine_sigma(env, phi, sigma, difference, variance).sigma
+        for i in range(n):
+            expected = env.determine_sigma(Rating(0.0, phi[i], sigma[i]), difference[i],
+                                           variance[i])
+            if _relative_error(batch[i], expected) > 1e-12:
+                return 'batched determine_sigma differs (tau=%g, element %d)' % (tau, i)
+
+
+def check_quality_matrix():
+    from glickoTR_batch import OpponentFinder
+    import numpy as np
+    env = Glicko2()
+    rng = random.Random(4)
+    ratings = [_random_rating(rng) for _ in range(200)]
+    # Repeated ratings tie on quality, also across the finder's window edges
+    ratings += [ratings[i] for i in range(0, 200, 5)] * 3
+    # A tight cluster between a player and some uncertain, hence better
+    # matched, opponents: only the finder's bound can find the latter
+    ratings += [Rating(5000, 400, 0.06)] + [Rating(5100, 30, 0.06)] * 40 + \
+        [Rating(5120, 400, 0.06)] * 10
+    columns = tuple(np.array([getattr(r, field) for r in ratings])
+                    for field in ('mu', 'phi', 'sigma'))
+    n = len(ratings)
+    matrix = env.quality_matrix(columns)
+    expected = env.expected_score_matrix(columns)
+    if not np.array_equal(matrix, env.quality_matrix(columns, block_size=7)) or \
+            not np.array_equal(expected, env.expected_score_matrix(columns, block_size=7)):
+        return 'the matrices depend on the block size'
+    for i in range(0, n, 7):
+        rating = env.scale_down(ratings[i])
+        for j in range(0, n, 3):
+            if abs(matrix[i, j] - env.quality_1vs1(ratings[i], ratings[j])) > 1e-12:
+                return 'quality_matrix differs at (%d, %d)' % (i, j)
+            other = env.scale_down(ratings[j])
+            score = env.expect_score(rating, other, env.reduce_impact(other))
+            if abs(expected[i, j] - score) > 1e-12:
+                return 'expected_score_matrix differs at (%d, %d)' % (i, j)
+
+    finder = OpponentFinder(env, columns)
+    for i in range(n):
+        for k in (1, 10, n - 1):
+            opponents, quality = finder.best(i, k)
+            row = np.delete(matrix[i], i)
+            # Ties make the opponents at the k-th place interchangeable, so
+            # the qualities must match exactly and the indexes only be valid
+            if len(set(opponents.tolist())) != k or i in opponents or \
+                    not np.array_equal(quality, matrix[i, opponents]) or \
+                    not np.array_equal(quality, -np.sort(-row)[:k]):
+                return 'OpponentFinder.best(%d, %d) differs from quality_matrix' % (i, k)
+
+
+def check_metrics():
+    from glickoTR_batch import status_codes
+    from glickoTR_metrics import RatingMetrics
+    import numpy as np
+    env = Glicko2(tau=0.5)
+    ratings, rows = notebook_period(env, 500, 500 * MATCHES_PER_PLAYER, seed=6)
+    # The notebook never generates walkovers; they must count the same way too
+    rows += [(i, (i + 1) % len(ratings), 0, 0, WALKOVER) for i in range(0, len(ratings), 7)]
+    series = series_by_player(rows, ratings)
+    plain = [env.rate(rating, series.get(i, [])) for i, rating in enumerate(ratings)]
+    env.metrics = RatingMetrics()
+    for i, rating in enumerate(ratings):
+        if not _same_rating(env.rate(rating, series.get(i, [])), plain[i]):
+            return 'rate changes with metrics attached (player %d)' % i
+    scalar = env.metrics.close_period()
+    columns = list(zip(*rows))
+    env.rate_period(
+        tuple(np.array([getattr(r, field) for r in ratings]) for field in ('mu', 'phi', 'sigma')),
+        tuple(np.array(column) for column in columns[:4]) + (status_codes(columns[4]),))
+    batch = env.metrics.close_period()
+    for name in ('matches', 'clamped_scores', 'no_information', 'sigma_solves',
+                 'bracket_max_k', 'sigma_fallbacks'):
+        if scalar[name] != batch[name]:
+            return 'rate_period counts %s=%d, rate counts %d' % (name, batch[name], scalar[name])
+
+
+def check_opponent_cache():
+    from glickoTR import RatingTable
+    env = Glicko2(tau=0.5)
+    ratings, rows = notebook_period(env, 500, 500 * MATCHES_PER_PLAYER, seed=7)
+    series = series_by_player(rows, ratings)
+    table = RatingTable()
+    for rating in ratings:
+        table.append(rating)
+    plain = [env.rate(rating, series.get(i, [])) for i, rating in enumerate(ratings)]
+    pairs = [(ratings[p1], ratings[p2], g1, g2, status) for p1, p2, g1, g2, status in rows[:500]]
+    plain_matches = [env.rate_tennis_match(*pair) for pair in pairs]
+    plain_quality = [env.quality_1vs1(table[p1], table[p2]) for p1, p2, _, _, _ in rows[:500]]
+    env.open_period()
+    for i, rating in enumerate(ratings):
+        if not _same_rating(env.rate(rating, series.get(i, [])), plain[i]):
+            return 'rate differs with an opponent cache (player %d)' % i
+    for pair, expected in zip(pairs, plain_matches):
+        if not all(_same_rating(a, b) for a, b in zip(env.rate_tennis_match(*pair), expected)):
+            return 'rate_tennis_match differs with an opponent cache'
+    for (p1, p2, _, _, _), expected in zip(rows[:500], plain_quality):
+        if env.quality_1vs1(table[p1], table[p2]) != expected:
+            return 'quality_1vs1 differs with an opponent cache'
+    # Rows and Ratings changed in place mid-period must not be served stale
+    cached = len(env.cache)
+    table[1] = Rating(table[0].mu + 900.0, 60.0, table[1].sigma)
+    ratings[1].mu += 900.0
+    fresh = Glicko2(tau=0.5)
+    if env.quality_1vs1(table[0], table[1]) != fresh.quality_1vs1(table[0], table[1]):
+        return 'quality_1vs1 uses a stale cached table row'
+    if env.quality_1vs1(ratings[0], ratings[1]) != fresh.quality_1vs1(ratings[0], ratings[1]):
+        return 'quality_1vs1 uses a stale cached Rating'
+    if not _same_rating(env.rate(ratings[0], series.get(0, [])),
+                        fresh.rate(ratings[0], series.get(0, []))):
+        return 'rate uses a stale cached opponent'
+    if len(env.cache) != cached:
+        return 'rate_tennis_match or an update grew the cache to %d entries' % len(env.cache)
+    env.close_period()
+    if len(env.cache):
+        return 'close_period left %d cache entries' % len(env.cache)
+
+
+def check_kernel():
+    import glickoTR_kernel as kernel
+    # The pure-Python kernels are exact; a JIT's exp/log may differ in the last ulps
+    tolerance = 0.0 if kernel.BACKEND == 'python' else 1e-12
+    env = Glicko2(tau=0.5)
+    rng = random.Random(8)
+    for _ in range(2000):
+        rating1, rating2 = _random_rating(rng), _random_rating(rng)
+        games1, games2 = rng.randint(0, 13), rng.randint(0, 13)
+        status = rng.choice((COMPLETED, RETIRED, WALKOVER))
+        expected = env.rate_tennis_match(rating1, rating2, games1, games2, status)
+        got = kernel.rate_tennis_match(env, rating1, rating2, games1, games2, status)
+        if not all(_same_rating(a, b, tolerance) for a, b in zip(got, expected)):
+            return 'match_kernel (%s) differs from rate_tennis_match' % kernel.BACKEND
+        series = [(rng.randint(0, 13), rng.randint(0, 13), _random_rating(rng),
+                   rng.choice((COMPLETED, RETIRED, WALKOVER))) for _ in range(rng.randint(0, 10))]
+        if not _same_rating(kernel.rate(env, rating1, series), env.rate(rating1, series), tolerance):
+            return 'rate_kernel (%s) differs from rate' % kernel.BACKEND
+
+
+def check_streaming():
+    from glickoTR_stream import StreamingRater
+    env = Glicko2(tau=0.5)
+    players = 300
+    ratings, rows = notebook_period(env, players, players * MATCHES_PER_PLAYER, seed=9)
+    initial = dict(enumerate(ratings))
+    # Walkovers, and a newcomer whose only match is a walkover
+    rows += [(i, (i + 1) % players, 0, 0, WALKOVER) for i in range(0, players, 7)]
+    rows.append((players, 0, 0, 0, WALKOVER))
+    ratings = ratings + [env.create_rating()]
+    stream = StreamingRater(env, initial)
+    stream.feed(rows)
+    series = series_by_player(rows, ratings)
+    expected = dict((i, env.rate(ratings[i], series[i])) for i in series)
+    for player_id, rating in expected.items():
+        if not _same_rating(stream.provisional(player_id), rating):
+            return 'provisional differs from rate (player %r)' % (player_id,)
+    known = len(stream)
+    stream.provisional('unknown')
+    stream.start_rating('unknown')
+    if len(stream) != known:
+        return 'a read-only query registered a player'
+    first = stream.close_period()
+    if set(first) != set(expected):
+        return 'close_period returned %d players, %d played' % (len(first), len(expected))
+    for player_id, rating in expected.items():
+        if not _same_rating(first[player_id], rating):
+            return 'close_period differs from rate (player %r)' % (player_id,)
+
+    # Only the lower half plays the second period; then a period without
+    # matches, so the others are two periods idle
+    rows = [row for row in rows if row[0] < players // 2 and row[1] < players // 2]
+    stream.feed(rows)
+    series = series_by_player(rows, first)
+    second = stream.close_period()
+    for player_id in series:
+        if not _same_rating(second[player_id], env.rate(first[player_id], series[player_id])):
+            return 'second period differs from rate (player %r)' % (player_id,)
+    stream.close_period()
+    for player_id, rating in first.items():
+        if player_id in series:
+            # One idle period: exactly rate(rating, [])
+            idle, tolerance = env.rate(second[player_id], []), 0.0
+        else:
+            # Two idle periods in closed form, up to rounding of chained calls
+            idle, tolerance = env.rate(env.rate(rating, []), []), 1e-12
+        if not _same_rating(stream.start_rating(player_id), idle, tolerance):
+            return 'start_rating after idle periods differs from rate (player %r)' % (player_id,)
+
+
+def check_parallel():
+    from glickoTR import RatingTable
+    from glickoTR_metrics import RatingMetrics
+    from glickoTR_parallel import rate_period_parallel
+    env = Glicko2(tau=0.5)
+    ratings, rows = notebook_period(env, 500, 500 * MATCHES_PER_PLAYER, seed=10)
+    rows += [(i, (i + 1) % len(ratings), 0, 0, WALKOVER) for i in range(0, len(ratings), 7)]
+    env.metrics = RatingMetrics()
+    by_rating = series_by_player(rows, ratings)
+    expected = [env.rate(rating, by_rating.get(i, [])) for i, rating in enumerate(ratings)]
+    counts = env.metrics.close_period()
+    table = RatingTable()
+    for rating in ratings:
+        table.append(rating)
+    by_id = series_by_player(rows)
+    for name, source in (('list', ratings), ('RatingTable', table)):
+        for workers in (1, 2):
+            got = rate_period_parallel(env, source, by_id, workers=workers)
+            for player_id, rating in enumerate(expected):
+                if not _same_rating(got[player_id], rating):
+                    return 'rate_period_parallel (%s, workers=%d) differs from rate (player %d)' % (
+                        name, workers, player_id)
+            merged = env.metrics.close_period()
+            for counter in ('matches', 'clamped_scores', 'no_information', 'sigma_solves',
+                            'bracket_max_k', 'sigma_fallbacks'):
+                if merged[counter] != counts[counter]:
+                    return 'rate_period_parallel (%s, workers=%d) counts %s=%d, rate counts %d' % (
+                        name, workers, counter, merged[counter], counts[counter])
+            if merged['iterations'] != counts['iterations']:
+                return 'rate_period_parallel (%s, workers=%d) merged a different iteration ' \
+                    'histogram' % (name, workers)
+
+
+def check_io():
+    import io
+    import shutil
+    import tempfile
+    from glickoTR_batch import RatingArrays, MatchArrays, status_codes
+    import glickoTR_io as gio
+    import numpy as np
+    env = Glicko2(tau=0.5)
+    ratings, rows = notebook_period(env, 200, 1000, seed=11)
+    pairs = [(str(i), rating) for i, rating in enumerate(ratings)]
+    pairs.append(('quoted "id" \\ \u00e9', Rating(1e-300, 1.5e300, 0.0)))
+    directory = tempfile.mkdtemp()
+    try:
+        # JSON round trips, with chunks small enough to cut every token
+        path = os.path.join(directory, 'ratings.json')
+        gio.write_ratings_json(path, pairs)
+        for chunk_size in (1, 2, 3, 7, 64, gio.CHUNK_SIZE):
+            got = list(gio.iter_ratings_json(path, chunk_size))
+            if [key for key, _ in got] != [key for key, _ in pairs] or \
+                    not all(_same_rating(a, b) for (_, a), (_, b) in zip(got, pairs)):
+                return 'ratings JSON round trip differs (chunk_size=%d)' % chunk_size
+        path = os.path.join(directory, 'matches.json')
+        gio.write_matches_json(path, rows)
+        for chunk_size in (1, 5, 64):
+            if list(gio.iter_matches_json(path, chunk_size)) != rows:
+                return 'matches JSON round trip differs (chunk_size=%d)' % chunk_size
+
+        # Malformed and truncated documents fail without reading on
+        path = os.path.join(directory, 'bad.json')
+        good = ', '.join('"%d": {"mu": 1500.0, "phi": 350.0, "sigma": 0.06}' % i
+                         for i in range(2000))
+        malformed = '{"a": {"mu": 1500.0, "phi" 350.0}, ' + good + '}'
+        for text in (malformed, '{' + good[:-20]):
+            with open(path, 'w') as f:
+                f.write(text)
+            try:
+                list(gio.iter_ratings_json(path, 64))
+            except ValueError:
+                pass
+            else:
+                return 'a malformed ratings JSON document was accepted'
+        stream = gio._JSONStream(io.StringIO(malformed), 64)
+        try:
+            list(stream.items())
+        except ValueError:
+            if len(stream.buf) > 2 * 64:
+                return 'a malformed document was read on (%d characters)' % len(stream.buf)
+
+        # Binary snapshots, including empty ones
+        matches = MatchArrays(*(tuple(np.array(column) for column in list(zip(*rows))[:4]) +
+                                (status_codes([row[4] for row in rows]),)))
+        rating_arrays = RatingArrays(*(np.array([getattr(r, field) for r in ratings])
+                                       for field in ('mu', 'phi', 'sigma')))
+        for size in (len(rows), 0):
+            path = os.path.join(directory, 'ratings.snap')
+            gio.save_ratings(path, RatingArrays(*(column[:size] for column in rating_arrays)))
+            loaded = gio.load_ratings(path)
+            if not all(np.array_equal(a, b[:size]) for a, b in zip(loaded, rating_arrays)):
+                return 'ratings snapshot round trip differs (%d rows)' % size
+            table = gio.load_rating_table(path)
+            if [tuple(column) for column in (table.mu, table.phi, table.sigma)] != \
+                    [tuple(column[:size]) for column in rating_arrays]:
+                return 'load_rating_table differs (%d rows)' % size
+            del loaded
+            path = os.path.join(directory, 'matches.snap')
+            gio.save_matches(path, MatchArrays(*(column[:size] for column in matches)))
+            loaded = gio.load_matches(path)
+            if not all(np.array_equal(a, b[:size]) for a, b in zip(loaded, matches)):
+                return 'matches snapshot round trip differs (%d rows)' % size
+            del loaded
+    finally:
+        shutil.rmtree(directory)
+
+
+def check_replay():
+    import shutil
+    import tempfile
+    from glickoTR_batch import MatchArrays, STATUS_COMPLETED
+    from glickoTR_replay import Replay
+    from glickoTR_simulate import Simulator, population
+    import numpy as np
+    engines = [Glicko2(tau=0.5), Glicko2(tau=0.3)]
+    ratings = population(engines[0], 300, seed=12)
+    matches = Simulator(engines[0], ratings, seed=12, status_mix=(0.8, 0.1, 0.1)).matches(6000)
+    # Periods 0-39, with a gap of idle periods in the middle
+    periods = np.sort(np.random.default_rng(12).integers(0, 36, 6000))
+    periods[periods >= 20] += 4
+    # A corrected match moved to an earlier period, then late matches
+    index = int(np.searchsorted(periods, 30))
+    correction = (17, 42, 3, 12, STATUS_COMPLETED)
+    late = MatchArrays(*(column[:50] for column in matches))
+
+    # The amended archive, built independently for a fresh replay
+    amended_periods = periods.copy()
+    amended_periods[index] = 25
+    amended = [column.copy() for column in matches]
+    for column, value in zip(amended, correction):
+        column[index] = value
+    amended_periods = np.concatenate((amended_periods, np.full(50, 27)))
+    amended = MatchArrays(*(np.concatenate(pair) for pair in zip(amended, late)))
+    expected = Replay(engines, ratings, amended_periods, amended,
+                      checkpoint_every=1000).run()
+
+    directory = tempfile.mkdtemp()
+    try:
+        for checkpoint_dir in (None, directory):
+            backend = 'in memory' if checkpoint_dir is None else 'on disk'
+            replay = Replay(engines, ratings, periods, matches, checkpoint_every=5,
+                            checkpoint_dir=checkpoint_dir)
+            replay.run()
+            replay.replace_match(index, 25, correction)
+            replay.add_matches(np.full(50, 27), late)
+            if replay.checkpoints != [0, 5, 10, 15, 20, 25]:
+                return 'Replay kept checkpoints %r after a change in period 25 (%s)' % (
+                    replay.checkpoints, backend)
+            for config, (got, want) in enumerate(zip(replay.run(), expected)):
+                if not all(np.array_equal(a, b) for a, b in zip(got, want)):
+                    return 'a resumed Replay differs from a fresh one (%s, engine %d)' % (
+                        backend, config)
+    finally:
+        shutil.rmtree(directory)
+
+
+CHECKS = (
+    ('scenarios', check_scenarios),
+    ('rate_tennis_match', check_rate_tennis_match),
+    ('rate_period', check_rate_period),
+    ('determine_sigma', check_determine_sigma),
+    ('quality_matrix', check_quality_matrix),
+    ('metrics', check_metrics),
+    ('opponent_cache', check_opponent_cache),
+    ('kernel', check_kernel),
+    ('streaming', check_streaming),
+    ('parallel', check_parallel),
+    ('io', check_io),
+    ('replay', check_replay),
+)
+
+
+def run_checks():
+    """Runs every check; returns the list of (name, failure) that failed."""
+    failures = []
+    for name, check in CHECKS:
+        failure = check()
+        print('check %-20s %s' % (name, 'ok' if failure is None else 'FAILED: ' + failure))
+        if failure is not None:
+            failures.append((name, failure))
+    return failures
+
+
+# --- Benchmarks ---------------------------------------------------------------
+# Each benchmark yields (name, seconds per unit, unit).
+
+def bench_rate(quick):
+    env = Glicko2(tau=0.5)
+    rng = random.Random(5)
+    rating = _random_rating(rng)
+    for length in (1, 10, 30, 100):
+        series = [(rng.randint(0, 13), rng.randint(0, 13), _random_rating(rng), COMPLETED)
+                  for _ in range(length)]
+        yield ('rate[series=%d]' % length,
+               best_time(lambda: env.rate(rating, series), 200 if quick else 2000), 'call')
+
+
+def bench_determine_sigma(quick):
+    number = 2000 if quick else 20000
+    # Easy: d^2 > phi^2 + v, converges in a few Illinois steps
+    env = Glicko2(tau=0.5)
+    easy = Rating(0.0, 1.0, 0.06)
+    yield ('determine_sigma[easy]',
+           best_time(lambda: env.determine_sigma(easy, 3.0, 2.0), number), 'call')
+    # Hard: tau above MAX_TAU_FULL_BRACKET, so the bracket search evaluates
+    # f up to max_k times before the Illinois iterations
+    env = Glicko2(tau=2.0)
+    hard = Rating(0.0, 1.0, 0.06)
+    yield ('determine_sigma[hard]',
+           best_time(lambda: env.determine_sigma(hard, 0.5, 2.0), number // 10), 'call')
+
+
+def bench_single_match(quick):
+    env = Glicko2(tau=0.5)
+    rating1, rating2 = Rating(1550, 120, 0.06), Rating(1480, 90, 0.05)
+    number = 2000 if quick else 20000
+    yield ('rate_tennis_match',
+           best_time(lambda: env.rate_tennis_match(rating1, rating2, 12, 7, COMPLETED), number),
+           'match')
+    yield ('quality_1vs1',
+           best_time(lambda: env.quality_1vs1(rating1, rating2), number), 'call')
+    import glickoTR_kernel as kernel
+    kernel.rate_tennis_match(env, rating1, rating2, 12, 7, COMPLETED)  # JIT warm-up
+    yield ('kernel.rate_tennis_match',
+           best_time(lambda: kernel.rate_tennis_match(env, rating1, rating2, 12, 7, COMPLETED),
+                     number), 'match')
+
+
+def bench_periods(quick):
+    import numpy as np
+    from glickoTR_batch import status_codes
+    env = Glicko2(tau=0.5)
+    for players in (QUICK_PERIOD_SIZES if quick else PERIOD_SIZES):
+        ratings, rows = notebook_period(env, players, players * MATCHES_PER_PLAYER)
+        series = series_by_player(rows, ratings)
+
+        start = time.perf_counter()
+        for player_id, rating in enumerate(ratings):
+            env.rate(rating, series.get(player_id, []))
+        yield 'period_rate[players=%d]' % players, time.perf_counter() - start, 'period'
+
+        env.open_period()
+        start = time.perf_counter()
+        for player_id, rating in enumerate(ratings):
+            env.rate(rating, series.get(player_id, []))
+        yield 'period_rate_cached[players=%d]' % players, time.perf_counter() - start, 'period'
+        env.close_period()
+        env.cache = None
+
+        columns = list(zip(*rows))
+        rating_arrays = tuple(np.array([getattr(r, field) for r in ratings])
+                              for field in ('mu', 'phi', 'sigma'))
+        match_arrays = (tuple(np.array(column) for column in columns[:4]) +
+                        (status_codes(columns[4]),))
+        yield ('period_batch[players=%d]' % players,
+               best_time(lambda: env.rate_period(rating_arrays, match_arrays), 1, 3), 'period')
+
+
+def bench_simulate(quick):
+    from glickoTR_simulate import Simulator, population
+    env = Glicko2(tau=0.5)
+    players = QUICK_PERIOD_SIZES[-1] if quick else PERIOD_SIZES[-1]
+    simulator = Simulator(env, population(env, players, seed=1), seed=2)
+    matches = players * MATCHES_PER_PLAYER
+    yield ('simulate[matches=%d]' % matches,
+           best_time(lambda: simulator.matches(matches), 1, 3) / matches, 'match')
+
+
+BENCHMARKS = (bench_rate, bench_determine_sigma, bench_single_match, bench_periods,
+              bench_simulate)
+
+
+def run(quick=False):
+    results = {}
+    for benchmark in BENCHMARKS:
+        for name, seconds, unit in benchmark(quick):
+            results[name] = {'seconds': seconds, 'unit': unit}
+            print('%-32s %12.3f us/%s' % (name, seconds * 1e6, unit))
+    return results
+
+
+def _metadata():
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    import glickoTR_kernel
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'numpy': numpy_version,
+        'kernel': glickoTR_kernel.BACKEND,
+    }
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    """Returns the names of benchmarks that slowed down beyond threshold."""
+    slower = []
+    for name in sorted(set(baseline['results']) & set(current['results'])):
+        before = baseline['results'][name]['seconds']
+        after = current['results'][name]['seconds']
+        ratio = after / before
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  SLOWER'
+            slower.append(name)
+        print('%-32s %12.3f -> %12.3f us  (%+6.1f%%)%s' % (
+            name, before * 1e6, after * 1e6, (ratio - 1) * 100, flag))
+    for name in sorted(set(baseline['results']) ^ set(current['results'])):
+        print('%-32s only in %s' % (name, 'baseline' if name in baseline['results'] else 'current'))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="Run the checks and time every benchmark")
+    run_parser.add_argument('--output', help="Write results JSON here")
+    run_parser.add_argument('--quick', action='store_true',
+                            help="Fewer iterations and only the smallest period")
+    compare_parser = commands.add_parser('compare', help="Flag slowdowns against a baseline")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                                help="Tolerated slowdown as a fraction (default %(default)s)")
+    commands.add_parser('check', help="Only run the numerical equivalence checks")
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        sys.exit(1 if run_checks() else 0)
+    elif args.command == 'run':
+        if run_checks():
+            sys.exit(1)
+        results = {'meta': _metadata(), 'results': run(args.quick)}
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+                f.write('\n')
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        slower = compare(baseline, current, args.threshold)
+        if slower:
+            print('%d benchmark(s) slower than %.0f%% over baseline' % (len(slower), args.threshold * 100))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
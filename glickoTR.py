@@ -11,6 +11,9 @@
     :license: BSD, see LICENSE for more details.
 """
 import math
+from array import array
+from collections import namedtuple
+from time import perf_counter
 
 __version__ = '0.1.dev'
 
@@ -26,10 +29,31 @@ SIGMA = 0.06
 TAU = 1  # System constant (recommend 0.3 to 1.2) - controls volatility change speed
 EPSILON = 0.000001 # Convergence tolerance
 
+# Scale factor between the original (Glicko) and internal Glicko-2 scales
+RATIO = 173.7178
+
+# Expected scores are clamped to [SCORE_CLAMP, 1 - SCORE_CLAMP]
+SCORE_CLAMP = 1e-1
+
+# Retirement weighting: linear ramp up to RETIREMENT_THRESHOLD_GAMES,
+# capped at MAX_RETIREMENT_WEIGHT
+RETIREMENT_THRESHOLD_GAMES = 18.0
+MAX_RETIREMENT_WEIGHT = 0.8
+
+# Up to this |tau|, the volatility bracket search provably never stops
+# before max_k when d^2 <= phi^2 + v (see Glicko2._determine_sigma)
+MAX_TAU_FULL_BRACKET = 1.5
+
+# Integer status codes used by the array-based (batch) APIs; the code of a
+# status is its index in this tuple. Unknown codes get zero weight.
+STATUS_CODES = (COMPLETED, RETIRED, WALKOVER)
+
 
 class Rating(object):
     """Stores a player's rating details: mu (rating), phi (rating deviation),
     and sigma (rating volatility)."""
+    __slots__ = ('mu', 'phi', 'sigma')
+
     def __init__(self, mu=MU, phi=PHI, sigma=SIGMA):
         self.mu = mu
         self.phi = phi
@@ -41,18 +65,205 @@ class Rating(object):
         return '%s.%s(mu=%.3f, phi=%.3f, sigma=%.3f)' % args
 
 
+# A rating on the internal Glicko-2 scale, carrying its precomputed g(phi)
+ScaledRating = namedtuple('ScaledRating', 'mu phi sigma impact')
+
+
+def _impact(phi):
+    """g(phi) for a Glicko-2 scale RD (see `Glicko2.reduce_impact`)."""
+    return 1. / math.sqrt(1 + (3 * phi ** 2) / (math.pi ** 2))
+
+
+class RatingView(object):
+    """A lightweight, writable view of one player's row in a RatingTable.
+    Behaves like a Rating (mu, phi, sigma) without copying the values."""
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def mu(self):
+        return self.table.mu[self.index]
+
+    @mu.setter
+    def mu(self, value):
+        self.table.mu[self.index] = value
+
+    @property
+    def phi(self):
+        return self.table.phi[self.index]
+
+    @phi.setter
+    def phi(self, value):
+        self.table.phi[self.index] = value
+
+    @property
+    def sigma(self):
+        return self.table.sigma[self.index]
+
+    @sigma.setter
+    def sigma(self, value):
+        self.table.sigma[self.index] = value
+
+    __repr__ = Rating.__repr__
+
+
+class RatingTable(object):
+    """Stores the ratings of many players in three contiguous array('d')
+    buffers (mu, phi, sigma) indexed by player id.
+
+    `table[i]` returns a RatingView of player i, and `as_arrays()` exposes
+    the buffers to NumPy without copying. Note that the buffers cannot grow
+    (append/extend) while NumPy arrays created from them are still alive.
+    """
+    __slots__ = ('mu', 'phi', 'sigma')
+
+    def __init__(self, size=0, mu=MU, phi=PHI, sigma=SIGMA):
+        self.mu = array('d', [mu]) * size
+        self.phi = array('d', [phi]) * size
+        self.sigma = array('d', [sigma]) * size
+
+    def __len__(self):
+        return len(self.mu)
+
+    def __getitem__(self, player_id):
+        if not -len(self.mu) <= player_id < len(self.mu):
+            raise IndexError('player id out of range')
+        return RatingView(self, player_id % len(self.mu))
+
+    def __setitem__(self, player_id, rating):
+        self.mu[player_id] = rating.mu
+        self.phi[player_id] = rating.phi
+        self.sigma[player_id] = rating.sigma
+
+    def __iter__(self):
+        for player_id in range(len(self.mu)):
+            yield RatingView(self, player_id)
+
+    def append(self, rating):
+        """Adds a player with the given rating and returns its id."""
+        self.mu.append(rating.mu)
+        self.phi.append(rating.phi)
+        self.sigma.append(rating.sigma)
+        return len(self.mu) - 1
+
+    def get(self, player_id):
+        """Returns a detached Rating copy of a player's current values."""
+        return Rating(self.mu[player_id], self.phi[player_id], self.sigma[player_id])
+
+    def as_arrays(self):
+        """Returns zero-copy NumPy views (mu, phi, sigma) of the buffers,
+        suitable for `Glicko2.rate_period`. Requires NumPy."""
+        import numpy as np
+        return (np.frombuffer(self.mu), np.frombuffer(self.phi),
+                np.frombuffer(self.sigma))
+
+    def assign(self, ratings):
+        """Overwrites every player's rating from (mu, phi, sigma) sequences,
+        e.g. the output of `Glicko2.rate_period`."""
+        for column, values in zip((self.mu, self.phi, self.sigma), ratings):
+            if len(values) != len(column):
+                raise ValueError('expected %d values, got %d' % (len(column), len(values)))
+            column[:] = array('d', values)
+
+
+class OpponentCache(object):
+    """Period-scoped memo of ScaledRatings: each player's Glicko-2 scale
+    mu, phi and g(phi) are computed once per period, however many series
+    the player appears in.
+
+    Ratings are keyed by identity (the cache keeps them alive, so ids are
+    not reused), RatingTable rows by (table, player id). Every entry keeps
+    the (mu, phi, sigma) it was computed from and is recomputed if they
+    have changed, e.g. after `table[i] = new_rating`; `clear` invalidates
+    everything. See `Glicko2.open_period`.
+    """
+    __slots__ = ('engine', '_ratings', '_rows')
+
+    def __init__(self, engine):
+        self.engine = engine
+        # id(rating) -> (rating, mu, phi, sigma, ScaledRating)
+        self._ratings = {}
+        # (table, index) -> (mu, phi, sigma, ScaledRating)
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._ratings) + len(self._rows)
+
+    def scaled(self, rating):
+        """Returns the ScaledRating of `rating` (see `Glicko2.to_scaled`),
+        computing it on first use or when the rating has changed."""
+        mu, phi, sigma = rating.mu, rating.phi, rating.sigma
+        entry = self._ratings.get(id(rating))
+        if entry is not None:
+            if entry[1] == mu and entry[2] == phi and entry[3] == sigma:
+                return entry[4]
+        elif type(rating) is RatingView:
+            # Views are created per access; key them by their table row
+            key = (rating.table, rating.index)
+            entry = self._rows.get(key)
+            if entry is None or entry[0] != mu or entry[1] != phi or entry[2] != sigma:
+                entry = self._rows[key] = (mu, phi, sigma, self.engine.to_scaled(rating))
+            return entry[3]
+        scaled = self.engine.to_scaled(rating)
+        self._ratings[id(rating)] = (rating, mu, phi, sigma, scaled)
+        return scaled
+
+    def clear(self):
+        """Invalidates every entry (call when the period closes)."""
+        self._ratings.clear()
+        self._rows.clear()
+
+
 class Glicko2(object):
     """
     The Glicko2 calculation engine, modified for tennis results.
 
     Takes into account game scores and match completeness.
+
+    `retirement_threshold_games` and `max_retirement_weight` shape the
+    weight of retired matches (see `_calculate_match_weight`).
+    `metrics` is an optional recorder (see glickoTR_metrics.RatingMetrics)
+    for convergence counters and per-stage timings; None disables it.
+    `cache` is the period's OpponentCache, if any (see `open_period`).
     """
-    def __init__(self, mu=MU, phi=PHI, sigma=SIGMA, tau=TAU, epsilon=EPSILON):
+    def __init__(self, mu=MU, phi=PHI, sigma=SIGMA, tau=TAU, epsilon=EPSILON,
+                 metrics=None, retirement_threshold_games=RETIREMENT_THRESHOLD_GAMES,
+                 max_retirement_weight=MAX_RETIREMENT_WEIGHT):
         self.mu = mu
         self.phi = phi
         self.sigma = sigma
         self.tau = tau
         self.epsilon = epsilon
+        self.retirement_threshold_games = retirement_threshold_games
+        self.max_retirement_weight = max_retirement_weight
+        self.metrics = metrics
+        self.cache = None
+
+    def open_period(self):
+        """Attaches an OpponentCache for the coming rating period: `rate`
+        (for opponents) and `quality_1vs1` then scale every rating down (and
+        compute its g(phi)) only once while it stays unchanged.
+
+        Returns:
+            OpponentCache: The attached cache.
+        """
+        self.cache = OpponentCache(self)
+        return self.cache
+
+    def close_period(self):
+        """Ends the rating period: invalidates the OpponentCache (which stays
+        attached for the next period) and closes the metrics period.
+
+        Returns:
+            dict: The metrics snapshot of the period, or None without metrics.
+        """
+        if self.cache is not None:
+            self.cache.clear()
+        if self.metrics is not None:
+            return self.metrics.close_period()
 
     def create_rating(self, mu=None, phi=None, sigma=None):
         """Creates a Rating object, using system defaults if not provided."""
@@ -64,13 +275,17 @@ class Glicko2(object):
             sigma = self.sigma
         return Rating(mu, phi, sigma)
 
-    def scale_down(self, rating, ratio=173.7178):
+    def create_rating_table(self, size=0):
+        """Creates a RatingTable of `size` players with the system defaults."""
+        return RatingTable(size, self.mu, self.phi, self.sigma)
+
+    def scale_down(self, rating, ratio=RATIO):
         """Converts a Rating object to the internal Glicko-2 scale."""
         mu = (rating.mu - self.mu) / ratio
         phi = rating.phi / ratio
         return self.create_rating(mu, phi, rating.sigma)
 
-    def scale_up(self, rating, ratio=173.7178):
+    def scale_up(self, rating, ratio=RATIO):
         """Converts a Rating object from the internal Glicko-2 scale back
         to the original scale."""
         mu = rating.mu * ratio + self.mu
@@ -85,7 +300,7 @@ class Glicko2(object):
         """The original Glicko `g(RD)` function. Reduces the impact of games
         as a function of an opponent's RD (phi). High opponent RD = lower impact."""
         # This uses the rating deviation (phi) on the Glicko-2 scale
-        return 1. / math.sqrt(1 + (3 * rating.phi ** 2) / (math.pi ** 2))
+        return _impact(rating.phi)
 
     def expect_score(self, rating, other_rating, impact):
         """The original Glicko `E` function. Calculates the expected probability
@@ -94,9 +309,14 @@ class Glicko2(object):
         score = 1. / (1 + math.exp(-impact * (rating.mu - other_rating.mu)))
         # Clamp score to prevent it from being exactly 0 or 1, which causes variance_inv issues
         # Use a slightly larger epsilon than the main convergence one if needed
-        clamp_epsilon = 1e-1 #####
+        clamp_epsilon = SCORE_CLAMP #####
         return max(clamp_epsilon, min(score, 1.0 - clamp_epsilon))
 
+    def match_weight(self, status, player_games, opponent_games):
+        """The weight (0 to 1) a match carries in the rating update, from its
+        status and games (see `_calculate_match_weight`)."""
+        return self._calculate_match_weight(status, player_games, opponent_games)
+
     def _calculate_match_weight(self, status, player_games, opponent_games):
         """Determines the weight of a match based on its status and completeness.
         - Completed matches have full weight (1.0).
@@ -112,9 +332,9 @@ class Glicko2(object):
             if total_games <= 0: # Avoid division by zero / nonsensical input
                 return 0.0
             # Linear ramp up to 18 games (approx 2 sets), capped at 0.8 weight
-            # This ensures completed matches always have higher weight.
-            threshold_games = 18.0
-            max_retirement_weight = 0.8
+            # by default. This ensures completed matches always have higher weight.
+            threshold_games = self.retirement_threshold_games
+            max_retirement_weight = self.max_retirement_weight
             weight = min(1.0, total_games / threshold_games) * max_retirement_weight
             return weight
         else:
@@ -125,10 +345,15 @@ class Glicko2(object):
         """The iterative procedure to determine the new volatility (sigma').
         This is unchanged from the standard Glicko-2 algorithm.
         Rating object should be on the Glicko-2 scale."""
-        phi = rating.phi
+        return self._determine_sigma(rating.phi, rating.sigma, difference, variance)
+
+    def _determine_sigma(self, phi, sigma, difference, variance, record=True):
+        """`determine_sigma` on plain floats (Glicko-2 scale phi and sigma).
+        With record=False the solve is not reported to the engine's metrics."""
+        metrics = self.metrics if record else None
         difference_squared = difference ** 2
         # 1. Let a = ln(sigma^2), and define f(x)
-        alpha = math.log(rating.sigma ** 2)
+        alpha = math.log(sigma ** 2)
 
         def f(x):
             """This function is derived from the Glicko-2 paper, used to find
@@ -147,12 +372,17 @@ class Glicko2(object):
 
         # 2. Set the initial values of the iterative algorithm.
         a = alpha
+        k = 0 # Bracket search steps, for metrics
+        # Check bounds to prevent infinite loop if f never goes negative
+        max_k = 100 # Safety break
         if difference_squared > phi ** 2 + variance:
             b = math.log(difference_squared - phi ** 2 - variance)
         else:
             k = 1
-            # Check bounds to prevent infinite loop if f never goes negative
-            max_k = 100 # Safety break
+            if abs(self.tau) <= MAX_TAU_FULL_BRACKET and phi ** 2 + variance >= 1e-15:
+                # In this branch f(alpha - k*tau) >= k/|tau| - 1/2 > 0 for every k,
+                # so the search below always runs to max_k; skip the evaluations.
+                k = max_k
             while k < max_k and f(alpha - k * math.sqrt(self.tau ** 2)) >= 0:
                 k += 1
             b = alpha - k * math.sqrt(self.tau ** 2)
@@ -167,12 +397,21 @@ class Glicko2(object):
             # For now, let's return current sigma; a more robust solution might be needed.
             # Warning: This might happen if variance is extremely high relative to diff^2
             # print(f"Warning: determine_sigma convergence issue (f_a={f_a}, f_b={f_b}). Returning current sigma.")
-            return rating.sigma # Fallback
+            if metrics is not None:
+                metrics.sigma_solved(0, k, max_k, True)
+            return sigma # Fallback
 
         # 4. While |B-A| > epsilon, carry out the iterative steps (Illinois method variant)
+        iterations = 0
         while abs(b - a) > self.epsilon:
+            iterations += 1
             c = a + (a - b) * f_a / (f_b - f_a)
             f_c = f(c)
+            if f_c == 0:
+                # Landed exactly on the root; the Illinois update below
+                # would divide by zero on the next step
+                b = c
+                break
             if f_c * f_b < 0:
                 a, f_a = b, f_b
             else:
@@ -184,6 +423,8 @@ class Glicko2(object):
             if abs(f_b - f_a) < self.epsilon:
                  break
 
+        if metrics is not None:
+            metrics.sigma_solved(iterations, k, max_k, False)
         # 5. Once |B-A| <= epsilon, set new sigma' = exp(A/2) or exp(B/2)
         # Using b as it's the last calculated point
         return math.exp(b / 2)
@@ -204,32 +445,116 @@ class Glicko2(object):
         Returns:
             Rating: The player's new Rating object for the next period.
         """
-        # Step 2. Convert rating to Glicko-2 scale
-        rating_g2 = self.scale_down(rating)
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
+        # Step 2. Convert rating (and every opponent) to Glicko-2 scale
+        mu = (rating.mu - self.mu) / RATIO
+        phi = rating.phi / RATIO
+        # Opponents come from the period's cache, if one is attached
+        to_scaled = self.to_scaled if self.cache is None else self.cache.scaled
+        series_g2 = [(player_games, opp_games, to_scaled(other_rating_orig), status)
+                     for player_games, opp_games, other_rating_orig, status in series]
+        if metrics is not None:
+            metrics.add_time('scaling', perf_counter() - start)
+
+        new_mu, new_phi, new_sigma = self._rate_scaled(mu, phi, rating.sigma, series_g2)
+
+        # Step 8. Convert new rating and RD back to original scale
+        if metrics is None:
+            return self._scale_up_values(new_mu, new_phi, new_sigma)
+        start = perf_counter()
+        new_rating = self._scale_up_values(new_mu, new_phi, new_sigma)
+        metrics.add_time('scaling', perf_counter() - start)
+        return new_rating
+
+    def decay(self, rating, periods=1):
+        """The rating after `periods` rating periods without matches, in
+        closed form: every idle period only adds sigma^2 to phi^2 on the
+        Glicko-2 scale, so phi' = sqrt(phi^2 + periods * sigma^2).
+
+        With periods=1 this is exactly `rate(rating, [])`; for more periods
+        it matches chaining those calls up to rounding (a few ulps), at
+        the cost of a single call.
+        """
+        if periods <= 0:
+            return rating
+        phi = rating.phi / RATIO
+        return self._scale_up_values((rating.mu - self.mu) / RATIO,
+                                     math.sqrt(phi ** 2 + periods * rating.sigma ** 2),
+                                     rating.sigma)
+
+    def to_scaled(self, rating, ratio=RATIO):
+        """Converts a Rating to a ScaledRating on the internal Glicko-2 scale,
+        with its g(phi) precomputed for use as an opponent."""
+        phi = rating.phi / ratio
+        return ScaledRating((rating.mu - self.mu) / ratio, phi, rating.sigma, _impact(phi))
+
+    def from_scaled(self, scaled):
+        """Converts a ScaledRating back to a Rating on the original scale
+        (mu is clamped here, at the API boundary)."""
+        return self._scale_up_values(scaled.mu, scaled.phi, scaled.sigma)
+
+    def _scale_up_values(self, mu, phi, sigma, ratio=RATIO):
+        """`scale_up` on plain floats."""
+        mu = mu * ratio + self.mu
+        # Clamp the final rating (mu) to a reasonable range
+        mu = max(0, min(mu, 10000))
+        return Rating(mu, phi * ratio, sigma)
+
+    def rate_scaled(self, scaled, series):
+        """Same as `rate`, but stays on the internal Glicko-2 scale: the
+        player and every opponent in `series` are ScaledRatings (see
+        `to_scaled`), and so is the result. Keeping a population in this
+        form avoids re-scaling opponents and recomputing their g(phi) on
+        every call; convert back with `from_scaled` at the API boundary.
+        """
+        mu, phi, sigma = self._rate_scaled(scaled.mu, scaled.phi, scaled.sigma, series)
+        return ScaledRating(mu, phi, sigma, _impact(phi))
+
+    def _rate_scaled(self, mu, phi, sigma, series):
+        """The rating period update on plain floats (Glicko-2 scale).
+        Opponents in `series` are ScaledRatings. Returns (mu, phi, sigma)."""
+        metrics = self.metrics
+        if metrics is None:
+            variance_inv, difference, _ = self._accumulate_scaled(mu, series)
+        else:
+            start = perf_counter()
+            variance_inv, difference, clamped = self._accumulate_scaled(mu, series)
+            metrics.add_time('accumulation', perf_counter() - start)
+            metrics.count('matches', len(series))
+            metrics.count('clamped_scores', clamped)
+        return self._update_scaled(mu, phi, sigma, variance_inv, difference)
+
+    def _accumulate_scaled(self, mu, series):
+        """Sums one player's weighted match terms (Glicko-2 scale).
 
+        Returns:
+            tuple: (variance_inv, difference, clamped), where clamped counts
+            the expected scores that hit the SCORE_CLAMP bounds.
+        """
         # Calculate intermediate values: variance_inv (1/v) and difference (Delta)
         variance_inv = 0
         difference = 0
+        clamped = 0
 
-        if not series:
-            # No games played in the period, only update RD based on volatility (Step 6 logic)
-            phi_star = math.sqrt(rating_g2.phi ** 2 + rating_g2.sigma ** 2)
-            # No change to mu or sigma if no games played
-            return self.scale_up(self.create_rating(rating_g2.mu, phi_star, rating_g2.sigma))
-
-        for player_games, opp_games, other_rating_orig, status in series:
+        for player_games, opp_games, other, status in series:
             # Calculate weight for this match
             match_weight = self._calculate_match_weight(status, player_games, opp_games)
 
             if match_weight <= 0:
                 continue # Skip walkovers or zero-weight matches
 
-            # Convert opponent rating to Glicko-2 scale
-            other_rating_g2 = self.scale_down(other_rating_orig)
-            # Calculate opponent impact g(phi)
-            impact = self.reduce_impact(other_rating_g2)
-            # Calculate expected score E (probability player wins match)
-            expected_score = self.expect_score(rating_g2, other_rating_g2, impact)
+            # Opponent impact g(phi) is precomputed on the ScaledRating
+            impact = other.impact
+            # Calculate expected score E (probability player wins match), clamped
+            expected_score = 1. / (1 + math.exp(-impact * (mu - other.mu)))
+            if expected_score < SCORE_CLAMP:
+                expected_score = SCORE_CLAMP
+                clamped += 1
+            elif expected_score > 1.0 - SCORE_CLAMP:
+                expected_score = 1.0 - SCORE_CLAMP
+                clamped += 1
 
             # Calculate actual score (game win percentage)
             total_games = player_games + opp_games
@@ -242,11 +567,42 @@ class Glicko2(object):
             variance_inv += match_weight * (impact ** 2 * expected_score * (1 - expected_score))
             difference += match_weight * (impact * (actual_score - expected_score))
 
-        # If variance_inv is zero or very close to zero (e.g., only played walkovers),
-        # handle similarly to no games played.
+        return variance_inv, difference, clamped
+
+    def update_scaled(self, scaled, variance_inv, difference, record=True):
+        """Finishes a rating period from a player's accumulated terms (the
+        sums of `match_terms_scaled`): the volatility solve and the new RD
+        and rating. Used by incremental raters that keep running sums
+        instead of a series (see glickoTR_stream).
+
+        Args:
+            scaled (ScaledRating): The player's start-of-period rating.
+            variance_inv (float): The summed weighted 1/v terms.
+            difference (float): The summed weighted Delta terms (not yet
+                                divided by variance_inv).
+            record (bool): Report the update to the engine's metrics; pass
+                           False for read-only queries.
+
+        Returns:
+            ScaledRating: The new rating; convert with `from_scaled`.
+        """
+        mu, phi, sigma = self._update_scaled(scaled.mu, scaled.phi, scaled.sigma,
+                                             variance_inv, difference, record)
+        return ScaledRating(mu, phi, sigma, _impact(phi))
+
+    def _update_scaled(self, mu, phi, sigma, variance_inv, difference, record=True):
+        """Steps 5-7 from the accumulated (weighted) 1/v and Delta sums.
+        All values are on the Glicko-2 scale. Returns (mu, phi, sigma).
+        With record=False nothing is reported to the engine's metrics (for
+        read-only queries that are not part of the period's work)."""
+        # If variance_inv is zero or very close to zero (no games, or only
+        # walkovers), only update RD based on volatility (Step 6 logic).
+        # No change to mu or sigma in that case.
+        metrics = self.metrics if record else None
         if variance_inv < self.epsilon:
-            phi_star = math.sqrt(rating_g2.phi ** 2 + rating_g2.sigma ** 2)
-            return self.scale_up(self.create_rating(rating_g2.mu, phi_star, rating_g2.sigma))
+            if metrics is not None:
+                metrics.count('no_information')
+            return mu, math.sqrt(phi ** 2 + sigma ** 2), sigma
 
         '''
         # Fix 1: Add a threshold check for minimum variance_inv to ensure stability
@@ -255,8 +611,7 @@ class Glicko2(object):
             # If variance is too small, indicates near-certain outcomes provided little info.
             # Only update RD based on volatility, similar to no games played.
             # print(f"Debug: variance_inv ({variance_inv:.2e}) below threshold. Skipping mu/sigma update.") # Optional debug log
-            phi_star = math.sqrt(rating_g2.phi ** 2 + rating_g2.sigma ** 2)
-            return self.scale_up(self.create_rating(rating_g2.mu, phi_star, rating_g2.sigma))
+            return mu, math.sqrt(phi ** 2 + sigma ** 2), sigma
         '''
 
         # Calculate final v and Delta
@@ -264,17 +619,43 @@ class Glicko2(object):
         difference /= variance_inv # This is Delta in the paper
 
         # Step 5. Determine the new value of sigma
-        new_sigma = self.determine_sigma(rating_g2, difference, variance)
+        if metrics is None:
+            new_sigma = self._determine_sigma(phi, sigma, difference, variance, record)
+        else:
+            start = perf_counter()
+            new_sigma = self._determine_sigma(phi, sigma, difference, variance)
+            solved = perf_counter()
+            metrics.add_time('sigma', solved - start)
 
         # Step 6. Update the rating deviation to the new pre-rating period value, phi*
-        phi_star = math.sqrt(rating_g2.phi ** 2 + new_sigma ** 2)
+        phi_star = math.sqrt(phi ** 2 + new_sigma ** 2)
 
         # Step 7. Update the rating and RD to the new values, mu' and phi'
         new_phi = 1. / math.sqrt(1. / phi_star ** 2 + 1. / variance)
-        new_mu = rating_g2.mu + new_phi ** 2 * difference # difference already includes 1/v^2 factor
+        new_mu = mu + new_phi ** 2 * difference # difference already includes 1/v^2 factor
+        if metrics is not None:
+            metrics.add_time('update', perf_counter() - solved)
+        return new_mu, new_phi, new_sigma
 
-        # Step 8. Convert new rating and RD back to original scale
-        return self.scale_up(self.create_rating(new_mu, new_phi, new_sigma))
+    def rate_period(self, ratings, matches):
+        """Vectorized rating period for a whole population (requires NumPy).
+
+        Args:
+            ratings (tuple): (mu, phi, sigma) arrays on the original scale,
+                             indexed by player.
+            matches (tuple): (player, opponent, player_games, opponent_games,
+                             status) arrays, one row per match. Each match
+                             counts towards both players; status holds the
+                             integer codes from STATUS_CODES.
+
+        Returns:
+            RatingArrays: The new (mu, phi, sigma) arrays for every player.
+            Players without a weighted match only have their RD inflated.
+
+        See glickoTR_batch.rate_period for the tolerance against `rate`.
+        """
+        from glickoTR_batch import rate_period
+        return rate_period(self, ratings, matches)
 
     def rate_tennis_match(self, rating1, rating2, games1, games2, status):
         """Convenience function to calculate updated ratings for both players
@@ -290,25 +671,111 @@ class Glicko2(object):
         Returns:
             tuple(Rating, Rating): The updated ratings for (Player 1, Player 2).
         """
-        # Create the series input for each player's perspective
-        series1 = [(games1, games2, rating2, status)]
-        series2 = [(games2, games1, rating1, status)] # Note swapped games
+        # Not through the opponent cache: a live feed passes new Ratings
+        # after every match, which the cache would only pile up
+        to_scaled = self.to_scaled
+        metrics = self.metrics
+        if metrics is None:
+            new1, new2 = self.rate_tennis_match_scaled(
+                to_scaled(rating1), to_scaled(rating2), games1, games2, status)
+            return self.from_scaled(new1), self.from_scaled(new2)
+
+        start = perf_counter()
+        scaled1, scaled2 = to_scaled(rating1), to_scaled(rating2)
+        metrics.add_time('scaling', perf_counter() - start)
+        new1, new2 = self.rate_tennis_match_scaled(scaled1, scaled2, games1, games2, status)
+        start = perf_counter()
+        new_ratings = self.from_scaled(new1), self.from_scaled(new2)
+        metrics.add_time('scaling', perf_counter() - start)
+        return new_ratings
+
+    def rate_tennis_match_scaled(self, scaled1, scaled2, games1, games2, status):
+        """`rate_tennis_match` on the internal Glicko-2 scale (ScaledRatings
+        in and out). Both players are updated in one pass, sharing the match
+        weight, the rating difference and the game totals.
 
-        # Calculate new ratings
-        new_rating1 = self.rate(rating1, series1)
-        new_rating2 = self.rate(rating2, series2)
+        Returns:
+            tuple(ScaledRating, ScaledRating): The updated (Player 1, Player 2).
+        """
+        variance_inv1, difference1, variance_inv2, difference2 = self.match_terms_scaled(
+            scaled1, scaled2, games1, games2, status)
+        mu1, phi1, sigma1 = self._update_scaled(scaled1.mu, scaled1.phi, scaled1.sigma,
+                                                variance_inv1, difference1)
+        mu2, phi2, sigma2 = self._update_scaled(scaled2.mu, scaled2.phi, scaled2.sigma,
+                                                variance_inv2, difference2)
+        return (ScaledRating(mu1, phi1, sigma1, _impact(phi1)),
+                ScaledRating(mu2, phi2, sigma2, _impact(phi2)))
+
+    def match_terms_scaled(self, scaled1, scaled2, games1, games2, status):
+        """The weighted 1/v and Delta terms one match contributes to each
+        player (ScaledRatings, Glicko-2 scale), computed in one pass. Summed
+        over a player's matches, they are what `update_scaled` takes.
 
-        return new_rating1, new_rating2
+        Returns:
+            tuple: (variance_inv1, difference1, variance_inv2, difference2).
+        """
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
+        # The weight only depends on the total games, so both sides share it
+        match_weight = self._calculate_match_weight(status, games1, games2)
+        if match_weight <= 0:
+            if metrics is not None:
+                metrics.add_time('accumulation', perf_counter() - start)
+                metrics.count('matches', 2)
+            return 0, 0, 0, 0
+        total_games = games1 + games2
+        if total_games <= 0:
+            score1 = score2 = 0.5
+        else:
+            score1 = float(games1) / total_games
+            score2 = float(games2) / total_games
+        mu_diff = scaled1.mu - scaled2.mu
+
+        # Player 1 faces Player 2's impact, and vice versa
+        clamped = 0
+        impact2 = scaled2.impact
+        expected1 = 1. / (1 + math.exp(-impact2 * mu_diff))
+        if expected1 < SCORE_CLAMP:
+            expected1 = SCORE_CLAMP
+            clamped += 1
+        elif expected1 > 1.0 - SCORE_CLAMP:
+            expected1 = 1.0 - SCORE_CLAMP
+            clamped += 1
+        impact1 = scaled1.impact
+        expected2 = 1. / (1 + math.exp(-impact1 * -mu_diff))
+        if expected2 < SCORE_CLAMP:
+            expected2 = SCORE_CLAMP
+            clamped += 1
+        elif expected2 > 1.0 - SCORE_CLAMP:
+            expected2 = 1.0 - SCORE_CLAMP
+            clamped += 1
+
+        variance_inv1 = match_weight * (impact2 ** 2 * expected1 * (1 - expected1))
+        difference1 = match_weight * (impact2 * (score1 - expected1))
+        variance_inv2 = match_weight * (impact1 ** 2 * expected2 * (1 - expected2))
+        difference2 = match_weight * (impact1 * (score2 - expected2))
+        if metrics is not None:
+            metrics.add_time('accumulation', perf_counter() - start)
+            metrics.count('matches', 2)
+            metrics.count('clamped_scores', clamped)
+        return variance_inv1, difference1, variance_inv2, difference2
 
     def quality_1vs1(self, rating1, rating2):
         """Estimates the quality of a match-up (how competitive it is expected to be).
         Lower values mean one player is a heavy favorite. Value near 1 means
         it's expected to be very close. Uses original scale ratings."""
         # Convert to Glicko-2 scale for calculations
-        r1_g2 = self.scale_down(rating1)
-        r2_g2 = self.scale_down(rating2)
-        impact1 = self.reduce_impact(r1_g2)
-        impact2 = self.reduce_impact(r2_g2)
+        if self.cache is None:
+            r1_g2 = self.scale_down(rating1)
+            r2_g2 = self.scale_down(rating2)
+            impact1 = self.reduce_impact(r1_g2)
+            impact2 = self.reduce_impact(r2_g2)
+        else:
+            r1_g2 = self.cache.scaled(rating1)
+            r2_g2 = self.cache.scaled(rating2)
+            impact1 = r1_g2.impact
+            impact2 = r2_g2.impact
         expected_score1 = self.expect_score(r1_g2, r2_g2, impact2) # P1 vs P2 (uses P2 impact)
         expected_score2 = self.expect_score(r2_g2, r1_g2, impact1) # P2 vs P1 (uses P1 impact)
 
@@ -320,3 +787,17 @@ class Glicko2(object):
         # The closer expected_score_avg is to 0.5, the higher the quality.
         quality = 2 * (0.5 - abs(0.5 - expected_score_avg))
         return quality
+
+    def quality_matrix(self, ratings, block_size=1024):
+        """`quality_1vs1` for every pair of players at once (requires NumPy).
+        `ratings` are (mu, phi, sigma) arrays; returns an N x N array. See
+        glickoTR_batch for blocked evaluation and top-k opponent queries."""
+        from glickoTR_batch import quality_matrix
+        return quality_matrix(self, ratings, block_size)
+
+    def expected_score_matrix(self, ratings, block_size=1024):
+        """N x N array of expected scores, [i, j] being player i against
+        player j (requires NumPy). `ratings` are (mu, phi, sigma) arrays.
+        See glickoTR_batch for blocked evaluation."""
+        from glickoTR_batch import expected_score_matrix
+        return expected_score_matrix(self, ratings, block_size)
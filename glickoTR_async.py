@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+    glickoTR_async
+    ~~~~~~~~~~~~~~
+
+    An asyncio front-end for rating single matches under bursty load.
+
+    AsyncRater queues incoming match results and coalesces them into
+    micro-batches, closed when `max_batch` matches are waiting or
+    `max_delay` seconds after the first one arrived. Each batch is rated
+    off the event loop by `rate_batch` in an executor (the loop's default
+    thread pool, or any executor passed in; `rate_batch` is a plain
+    module-level function, so a ProcessPoolExecutor works too).
+
+    Batches run one at a time and matches within a batch are applied in
+    arrival order, so two matches of the same player are never rated
+    concurrently and every result is exactly what serial
+    `Glicko2.rate_tennis_match` calls would have produced.
+"""
+import asyncio
+
+# Default micro-batch limits
+MAX_BATCH = 256
+MAX_DELAY = 0.002  # seconds
+
+
+def rate_batch(engine, ratings, matches):
+    """Rates matches one after another, each from both players' latest
+    ratings.
+
+    Args:
+        engine (Glicko2): The rating engine.
+        ratings (dict): {player_id: Rating} before the batch, for every
+                        player in `matches`.
+        matches (list): (player1, player2, games1, games2, status) tuples,
+                        in the order they must be applied.
+
+    Returns:
+        tuple: (results, ratings) where results holds, per match, either
+        the updated (Rating, Rating) pair or the exception it raised (the
+        ratings are then left as they were), and ratings maps every player
+        to their rating after the batch.
+    """
+    ratings = dict(ratings)
+    results = []
+    for player1, player2, games1, games2, status in matches:
+        try:
+            new_ratings = engine.rate_tennis_match(ratings[player1], ratings[player2],
+                                                   games1, games2, status)
+        except Exception as exc:
+            results.append(exc)
+            continue
+        ratings[player1], ratings[player2] = new_ratings
+        results.append(new_ratings)
+    return results, ratings
+
+
+class AsyncRater(object):
+    """Rates match results submitted from coroutines in micro-batches.
+
+    Args:
+        engine (Glicko2): The rating engine.
+        ratings (dict): Optional {player_id: Rating} to start from. Unknown
+                        players get engine defaults.
+        max_batch (int): Close a batch once this many matches are queued.
+        max_delay (float): Close a batch this many seconds after its first
+                           match arrived, however small it is.
+        executor: Where batches run (None: the loop's default executor).
+
+    Use as ``async with AsyncRater(env) as rater: ...``, or call `close`
+    when done; pending matches are rated before it returns.
+    """
+    def __init__(self, engine, ratings=None, max_batch=MAX_BATCH, max_delay=MAX_DELAY,
+                 executor=None):
+        self.engine = engine
+        self.ratings = dict(ratings) if ratings else {}
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.executor = executor
+        # Counters for sizing max_batch / max_delay
+        self.batches = 0
+        self.matches = 0
+        self._queue = None
+        self._worker = None
+        self._closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def rating(self, player_id):
+        """The player's current rating (all completed batches applied).
+        Unknown players get engine defaults without being registered; they
+        are added once one of their matches is rated."""
+        rating = self.ratings.get(player_id)
+        if rating is None:
+            return self.engine.create_rating()
+        return rating
+
+    def submit(self, player1, player2, games1, games2, status):
+        """Queues one match result; must be called from the event loop.
+
+        Returns:
+            asyncio.Future: Resolves to the updated (Rating, Rating) of
+            (player1, player2). The match is applied even if the future is
+            cancelled.
+        """
+        if self._closed:
+            raise RuntimeError('AsyncRater is closed')
+        loop = asyncio.get_running_loop()
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        future = loop.create_future()
+        self._queue.put_nowait(((player1, player2, games1, games2, status), future))
+        return future
+
+    async def rate_match(self, player1, player2, games1, games2, status):
+        """Submits one match and waits for both players' updated ratings."""
+        return await self.submit(player1, player2, games1, games2, status)
+
+    async def close(self):
+        """Stops accepting matches and waits until every queued one is rated."""
+        self._closed = True
+        if self._worker is not None:
+            self._queue.put_nowait(None)
+            await self._worker
+            self._worker = None
+
+    async def _next_batch(self):
+        """Waits for the next micro-batch. Returns (batch, stop)."""
+        loop = asyncio.get_running_loop()
+        item = await self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            batch, stop = await self._next_batch()
+            if not batch:
+                continue
+            matches = [match for match, _ in batch]
+            start = dict((player_id, self.rating(player_id))
+                         for match in matches for player_id in match[:2])
+            try:
+                results, ratings = await loop.run_in_executor(
+                    self.executor, rate_batch, self.engine, start, matches)
+            except Exception as exc:
+                # The batch never ran (e.g. a broken executor)
+                results, ratings = [exc] * len(batch), {}
+            self.ratings.update(ratings)
+            self.batches += 1
+            self.matches += len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.cancelled():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
@@ -1,6 +1,8 @@
 import math
 import argparse
 import json
+import sys
+from multiprocessing import Pool
 from glickoTR import Glicko2, Rating, COMPLETED, RETIRED, WALKOVER # Import necessary items
 
 # Default Glicko-2 parameters (should match glickoTR.py and glicko.ts)
@@ -137,23 +139,139 @@ def calculate_single_match_update(
     }
 
 
+# Number of result lines written (and flushed) at a time in --jsonl mode
+CHUNK_SIZE = 1000
+
+# Status strings accepted in records (the --status choices)
+STATUSES = ('completed', 'retired', 'walkover')
+
+# Per-process engine for --jsonl mode, built once by _init_engine
+_engine = None
+
+
+def create_engine() -> Glicko2:
+    """Builds the Glicko2 engine with the parameters shared with glicko.ts."""
+    return Glicko2(mu=DEFAULT_MU, phi=DEFAULT_PHI, sigma=DEFAULT_SIGMA, tau=TAU, epsilon=EPSILON)
+
+
+def _init_engine():
+    global _engine
+    _engine = create_engine()
+
+
+def process_record(line: str) -> tuple:
+    """
+    Runs calculate_single_match_update for one JSON Lines record and returns
+    the result as a single JSON line. Records use the CLI flag names
+    (p1_mu, p1_phi, p1_sigma, p2_mu, p2_phi, p2_sigma, p1_games, p2_games,
+    status); an optional "id" is echoed back. Invalid records produce an
+    {"error": ...} line so output stays aligned with input.
+
+    Returns (output_line, failed).
+    """
+    record_id = None
+    failed = False
+    try:
+        record = json.loads(line)
+        record_id = record.get("id")
+        if record["status"] not in STATUSES:
+            raise ValueError("status must be one of %s, got %r" % (", ".join(STATUSES), record["status"]))
+        result = calculate_single_match_update(
+            player_rating=Rating(mu=float(record["p1_mu"]), phi=float(record["p1_phi"]),
+                                 sigma=float(record["p1_sigma"])),
+            opponent_rating=Rating(mu=float(record["p2_mu"]), phi=float(record["p2_phi"]),
+                                   sigma=float(record["p2_sigma"])),
+            player_games=int(record["p1_games"]),
+            opponent_games=int(record["p2_games"]),
+            status=record["status"],
+            engine=_engine
+        )
+    except (ValueError, KeyError, TypeError, AttributeError, ArithmeticError) as e:
+        result = {"error": "%s: %s" % (type(e).__name__, e)}
+        failed = True
+    if record_id is not None:
+        result = dict([("id", record_id)] + list(result.items()))
+    return json.dumps(result), failed
+
+
+def run_jsonl(infile, outfile, workers: int = 1, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Streams JSON Lines match records from infile to one result line each in
+    outfile, in input order. The engine is built once per process and output
+    is flushed every chunk_size lines. Returns the number of error lines.
+    """
+    lines = (line for line in infile if line.strip())
+    if workers > 1:
+        pool = Pool(workers, initializer=_init_engine)
+        results = pool.imap(process_record, lines, chunksize=chunk_size)
+    else:
+        pool = None
+        _init_engine()
+        results = map(process_record, lines)
+
+    errors = 0
+    chunk = []
+    try:
+        for result, failed in results:
+            errors += failed
+            chunk.append(result)
+            if len(chunk) >= chunk_size:
+                outfile.write("\n".join(chunk) + "\n")
+                outfile.flush()
+                chunk = []
+    finally:
+        # Also on an unexpected error, so the lines before it are not lost
+        if chunk:
+            outfile.write("\n".join(chunk) + "\n")
+            outfile.flush()
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return errors
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Calculate GlickoTR update for a single match.')
-    parser.add_argument('--p1_mu', type=float, required=True, help="Player 1 initial mu")
-    parser.add_argument('--p1_phi', type=float, required=True, help="Player 1 initial phi (RD)")
-    parser.add_argument('--p1_sigma', type=float, required=True, help="Player 1 initial sigma (volatility)")
-    parser.add_argument('--p2_mu', type=float, required=True, help="Player 2 initial mu")
-    parser.add_argument('--p2_phi', type=float, required=True, help="Player 2 initial phi (RD)")
-    parser.add_argument('--p2_sigma', type=float, required=True, help="Player 2 initial sigma (volatility)")
-    parser.add_argument('--p1_games', type=int, required=True, help="Games won by Player 1")
-    parser.add_argument('--p2_games', type=int, required=True, help="Games won by Player 2")
-    parser.add_argument('--status', type=str, required=True, choices=['completed', 'retired', 'walkover'], help="Match status")
+    parser.add_argument('--p1_mu', type=float, help="Player 1 initial mu")
+    parser.add_argument('--p1_phi', type=float, help="Player 1 initial phi (RD)")
+    parser.add_argument('--p1_sigma', type=float, help="Player 1 initial sigma (volatility)")
+    parser.add_argument('--p2_mu', type=float, help="Player 2 initial mu")
+    parser.add_argument('--p2_phi', type=float, help="Player 2 initial phi (RD)")
+    parser.add_argument('--p2_sigma', type=float, help="Player 2 initial sigma (volatility)")
+    parser.add_argument('--p1_games', type=int, help="Games won by Player 1")
+    parser.add_argument('--p2_games', type=int, help="Games won by Player 2")
+    parser.add_argument('--status', type=str, choices=['completed', 'retired', 'walkover'], help="Match status")
+    parser.add_argument('--jsonl', metavar='PATH',
+                        help="Read match records as JSON Lines from PATH ('-' for stdin) and "
+                             "write one result line per record instead of a single match")
+    parser.add_argument('--output', metavar='PATH', help="Write --jsonl results to PATH instead of stdout")
+    parser.add_argument('--workers', type=int, default=1, help="Processes to fan --jsonl records out to")
+    parser.add_argument('--chunk_size', type=int, default=CHUNK_SIZE,
+                        help="Result lines written per flush in --jsonl mode")
 
     args = parser.parse_args()
 
+    if args.jsonl:
+        infile = sys.stdin if args.jsonl == '-' else open(args.jsonl, encoding='utf-8')
+        outfile = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            errors = run_jsonl(infile, outfile, workers=args.workers, chunk_size=args.chunk_size)
+        finally:
+            if infile is not sys.stdin:
+                infile.close()
+            if outfile is not sys.stdout:
+                outfile.close()
+        sys.exit(1 if errors else 0)
+
+    missing = [name for name in ('p1_mu', 'p1_phi', 'p1_sigma', 'p2_mu', 'p2_phi', 'p2_sigma',
+                                 'p1_games', 'p2_games', 'status') if getattr(args, name) is None]
+    if missing:
+        parser.error("the following arguments are required: %s" %
+                     ", ".join('--' + name for name in missing))
+
     # Initialize the Glicko2 engine with default parameters
     # Ensure these match the parameters used in glickoTR.py and glicko.ts
-    engine = Glicko2(mu=DEFAULT_MU, phi=DEFAULT_PHI, sigma=DEFAULT_SIGMA, tau=TAU, epsilon=EPSILON)
+    engine = create_engine()
 
     # Create initial Rating objects
     player1 = Rating(mu=args.p1_mu, phi=args.p1_phi, sigma=args.p1_sigma)
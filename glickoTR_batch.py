@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+"""
+    glickoTR_batch
+    ~~~~~~~~~~~~~~
+
+    Vectorized (NumPy) rating period engine for glickoTR.
+
+    Rates a whole population in one pass from struct-of-arrays inputs
+    instead of calling `Glicko2.rate` once per player. The per-match terms
+    g(phi), E, the weighted 1/v and Delta are computed for all matches at
+    once and accumulated per player with scatter-adds.
+
+    Tolerance: every output (mu, phi, sigma) agrees with the per-player
+    `Glicko2.rate` to within RATE_PERIOD_TOLERANCE (relative). Sources of
+    difference are the summation order of the per-match terms and the last
+    ulp of NumPy's exp/log, which can shift where the volatility iteration
+    stops by at most one step.
+"""
+import math
+from collections import namedtuple
+from time import perf_counter
+
+import numpy as np
+
+from glickoTR import (RATIO, SCORE_CLAMP, RETIREMENT_THRESHOLD_GAMES,
+                      MAX_RETIREMENT_WEIGHT, MAX_TAU_FULL_BRACKET, STATUS_CODES,
+                      COMPLETED, RETIRED)
+
+# Relative tolerance of `rate_period` against the per-player `rate`
+RATE_PERIOD_TOLERANCE = 1e-9
+
+STATUS_COMPLETED = STATUS_CODES.index(COMPLETED)
+STATUS_RETIRED = STATUS_CODES.index(RETIRED)
+
+# Struct-of-arrays containers for the batch APIs
+RatingArrays = namedtuple('RatingArrays', 'mu phi sigma')
+SigmaSolution = namedtuple('SigmaSolution', 'sigma iterations bracket_steps')
+MatchArrays = namedtuple('MatchArrays',
+                         'player opponent player_games opponent_games status')
+
+
+def status_codes(statuses):
+    """Converts a sequence of status strings (COMPLETED, RETIRED, WALKOVER)
+    to an array of integer codes. Unknown statuses map to -1 (zero weight)."""
+    lookup = dict((status, code) for code, status in enumerate(STATUS_CODES))
+    return np.array([lookup.get(status, -1) for status in statuses], dtype=np.int8)
+
+
+def match_weights(status, player_games, opponent_games,
+                  threshold_games=RETIREMENT_THRESHOLD_GAMES,
+                  max_retirement_weight=MAX_RETIREMENT_WEIGHT):
+    """Vectorized `Glicko2._calculate_match_weight` over arrays of matches
+    (pass the engine's retirement parameters if they are not the defaults)."""
+    status = np.asarray(status)
+    total_games = (np.asarray(player_games, dtype=np.float64) +
+                   np.asarray(opponent_games, dtype=np.float64))
+    weight = np.zeros(len(status))
+    weight[status == STATUS_COMPLETED] = 1.0
+    retired = (status == STATUS_RETIRED) & (total_games > 0)
+    weight[retired] = (np.minimum(1.0, total_games[retired] / threshold_games) *
+                       max_retirement_weight)
+    return weight
+
+
+def reduce_impact(phi):
+    """Vectorized g(phi) on the Glicko-2 scale."""
+    return 1. / np.sqrt(1 + (3 * phi ** 2) / (np.pi ** 2))
+
+
+def expect_score(mu, other_mu, impact):
+    """Vectorized, clamped E on the Glicko-2 scale."""
+    score = 1. / (1 + np.exp(-impact * (mu - other_mu)))
+    return np.clip(score, SCORE_CLAMP, 1.0 - SCORE_CLAMP)
+
+
+def accumulate(engine, mu_g2, phi_g2, matches):
+    """Accumulates the weighted 1/v and Delta sums (before division by 1/v)
+    for every player. Each match counts from both players' perspectives.
+
+    Returns:
+        tuple(ndarray, ndarray): (variance_inv, difference) per player.
+    """
+    player = np.asarray(matches[0], dtype=np.intp)
+    opponent = np.asarray(matches[1], dtype=np.intp)
+    player_games = np.asarray(matches[2], dtype=np.float64)
+    opponent_games = np.asarray(matches[3], dtype=np.float64)
+    weight = match_weights(matches[4], player_games, opponent_games,
+                           engine.retirement_threshold_games, engine.max_retirement_weight)
+    if engine.metrics is not None:
+        # Both sides of every match, zero-weight ones included (as in `rate`)
+        engine.metrics.count('matches', 2 * len(weight))
+
+    # Drop walkovers and other zero-weight matches up front
+    live = weight > 0
+    if not live.all():
+        player, opponent = player[live], opponent[live]
+        player_games, opponent_games = player_games[live], opponent_games[live]
+        weight = weight[live]
+
+    # Lay out both perspectives of every match side by side
+    idx = np.concatenate((player, opponent))
+    other = np.concatenate((opponent, player))
+    games_for = np.concatenate((player_games, opponent_games))
+    games_against = np.concatenate((opponent_games, player_games))
+    weight = np.concatenate((weight, weight))
+
+    impact = reduce_impact(phi_g2)[other]
+    expected_score = expect_score(mu_g2[idx], mu_g2[other], impact)
+    total_games = games_for + games_against
+    actual_score = np.full(len(idx), 0.5)
+    played = total_games > 0
+    actual_score[played] = games_for[played] / total_games[played]
+
+    if engine.metrics is not None:
+        engine.metrics.count('clamped_scores', int(np.count_nonzero(
+            (expected_score <= SCORE_CLAMP) | (expected_score >= 1.0 - SCORE_CLAMP))))
+
+    n = len(mu_g2)
+    variance_inv = np.bincount(
+        idx, weights=weight * (impact ** 2 * expected_score * (1 - expected_score)),
+        minlength=n)
+    difference = np.bincount(
+        idx, weights=weight * (impact * (actual_score - expected_score)), minlength=n)
+    return variance_inv, difference
+
+
+def _volatility_f(x, phi_squared, variance, difference_squared, alpha, tau):
+    """Vectorized form of the `f` closure in `Glicko2.determine_sigma`."""
+    exp_x = np.exp(x)
+    tmp = phi_squared + variance + exp_x
+    a = exp_x * (difference_squared - phi_squared - variance - exp_x) / (2 * tmp ** 2)
+    b = (x - alpha) / (tau ** 2)
+    # Same guard as the scalar version when the denominator vanishes
+    return np.where(tmp < 1e-15, -1.0 / (tau ** 2), a - b)
+
+
+def determine_sigma(engine, phi, sigma, difference, variance, max_k=100):
+    """Batched `Glicko2.determine_sigma`.
+
+    Runs the bracket search and the Illinois iterations for all players in
+    lockstep, each element dropping out of the loop as soon as it meets the
+    same stopping rules as the scalar version. Players that hit the
+    `f_a * f_b >= 0` fallback keep their old sigma.
+
+    Args:
+        engine (Glicko2): Supplies tau and epsilon.
+        phi, sigma, difference, variance (ndarray): Per-player inputs on
+            the Glicko-2 scale (difference is Delta, variance is v).
+        max_k (int): Bracket search limit, as in the scalar version.
+
+    Returns:
+        SigmaSolution: (sigma, iterations, bracket_steps) arrays, where
+        iterations counts Illinois steps and bracket_steps the final k of
+        the bracket search (0 when it was not needed).
+    """
+    phi = np.asarray(phi, dtype=np.float64)
+    sigma = np.asarray(sigma, dtype=np.float64)
+    difference = np.asarray(difference, dtype=np.float64)
+    variance = np.asarray(variance, dtype=np.float64)
+    tau = engine.tau
+    n = len(phi)
+
+    phi_squared = phi ** 2
+    difference_squared = difference ** 2
+    # 1. Let a = ln(sigma^2)
+    alpha = np.log(sigma ** 2)
+
+    def f(x, sel):
+        return _volatility_f(x, phi_squared[sel], variance[sel],
+                             difference_squared[sel], alpha[sel], tau)
+
+    # 2. Set the initial values of the iterative algorithm
+    a = alpha.copy()
+    b = np.empty(n)
+    bracket_steps = np.zeros(n, dtype=np.int64)
+    excess = difference_squared - phi_squared - variance
+    direct = excess > 0
+    b[direct] = np.log(excess[direct])
+
+    step = math.sqrt(tau ** 2)
+    k = np.ones(n, dtype=np.int64)
+    searching = ~direct
+    if abs(tau) <= MAX_TAU_FULL_BRACKET:
+        # The search provably runs to max_k here (see Glicko2._determine_sigma)
+        full = searching & (phi_squared + variance >= 1e-15)
+        k[full] = max_k
+        searching &= ~full
+    searching = np.flatnonzero(searching)
+    while len(searching):
+        keep = (k[searching] < max_k) & (f(alpha[searching] - k[searching] * step, searching) >= 0)
+        k[searching[keep]] += 1
+        searching = searching[keep]
+    b[~direct] = alpha[~direct] - k[~direct] * step
+    bracket_steps[~direct] = k[~direct]
+
+    # 3. Evaluate f at both ends; same-sign brackets fall back to old sigma
+    everyone = slice(None)
+    f_a, f_b = f(a, everyone), f(b, everyone)
+    new_sigma = sigma.copy()
+    iterations = np.zeros(n, dtype=np.int64)
+    bracketed = f_a * f_b < 0
+
+    # 4. Illinois iterations, in lockstep over the still-running elements
+    running = np.flatnonzero(bracketed & (np.abs(b - a) > engine.epsilon))
+    while len(running):
+        a_r, b_r, fa_r, fb_r = a[running], b[running], f_a[running], f_b[running]
+        c = a_r + (a_r - b_r) * fa_r / (fb_r - fa_r)
+        f_c = f(c, running)
+        exact = f_c == 0
+        swap = f_c * fb_r < 0
+        illinois = ~swap & ~exact
+        a_r = np.where(swap, b_r, a_r)
+        fa_r = np.where(swap, fb_r, fa_r)
+        fa_r[illinois] *= fb_r[illinois] / (fb_r[illinois] + f_c[illinois])
+        a[running], f_a[running] = a_r, fa_r
+        b[running], f_b[running] = c, f_c
+        iterations[running] += 1
+        done = exact | (np.abs(f_c - fa_r) < engine.epsilon) | (np.abs(c - a_r) <= engine.epsilon)
+        running = running[~done]
+
+    # 5. sigma' = exp(B/2) for every bracketed player
+    new_sigma[bracketed] = np.exp(b[bracketed] / 2)
+    if engine.metrics is not None:
+        _record_sigma(engine.metrics, iterations[bracketed], bracket_steps, max_k,
+                      n - int(np.count_nonzero(bracketed)))
+    return SigmaSolution(new_sigma, iterations, bracket_steps)
+
+
+def _record_sigma(metrics, iterations, bracket_steps, max_k, fallbacks):
+    """Adds a batch of volatility solves to `metrics` (see
+    RatingMetrics.sigma_solved)."""
+    metrics.count('sigma_solves', len(bracket_steps))
+    metrics.count('bracket_searches', int(np.count_nonzero(bracket_steps)))
+    metrics.count('bracket_max_k', int(np.count_nonzero(bracket_steps >= max_k)))
+    metrics.count('sigma_fallbacks', fallbacks)
+    steps, counts = np.unique(iterations, return_counts=True)
+    for step, count in zip(steps.tolist(), counts.tolist()):
+        metrics.observe_iterations(step, count)
+
+
+def rate_period(engine, ratings, matches):
+    """Rates every player for one rating period.
+
+    Args:
+        engine (Glicko2): Supplies the system parameters.
+        ratings (tuple): (mu, phi, sigma) arrays on the original scale.
+        matches (tuple): (player, opponent, player_games, opponent_games,
+                         status) arrays; status holds STATUS_CODES indices.
+
+    Returns:
+        RatingArrays: The new ratings on the original scale.
+    """
+    metrics = engine.metrics
+    if metrics is not None:
+        start = perf_counter()
+    mu = np.asarray(ratings[0], dtype=np.float64)
+    phi = np.asarray(ratings[1], dtype=np.float64)
+    sigma = np.asarray(ratings[2], dtype=np.float64)
+
+    # Step 2. Convert ratings to the Glicko-2 scale
+    mu_g2 = (mu - engine.mu) / RATIO
+    phi_g2 = phi / RATIO
+    if metrics is not None:
+        start = _lap(metrics, 'scaling', start)
+
+    variance_inv, difference = accumulate(engine, mu_g2, phi_g2, matches)
+    if metrics is not None:
+        start = _lap(metrics, 'accumulation', start)
+
+    # Players with (effectively) no weighted games only get RD inflation
+    active = np.flatnonzero(variance_inv >= engine.epsilon)
+    if metrics is not None:
+        metrics.count('no_information', len(mu) - len(active))
+    new_mu = mu_g2.copy()
+    new_phi = np.sqrt(phi_g2 ** 2 + sigma ** 2)
+    new_sigma = sigma.copy()
+
+    variance = 1. / variance_inv[active]
+    difference = difference[active] / variance_inv[active]
+
+    # Step 5. Determine the new value of sigma
+    new_sigma[active] = determine_sigma(engine, phi_g2[active], sigma[active],
+                                        difference, variance).sigma
+    if metrics is not None:
+        start = _lap(metrics, 'sigma', start)
+
+    # Steps 6 and 7. Update phi* and then the rating and RD
+    phi_star = np.sqrt(phi_g2[active] ** 2 + new_sigma[active] ** 2)
+    new_phi[active] = 1. / np.sqrt(1. / phi_star ** 2 + 1. / variance)
+    new_mu[active] = mu_g2[active] + new_phi[active] ** 2 * difference
+    if metrics is not None:
+        start = _lap(metrics, 'update', start)
+
+    # Step 8. Convert back to the original scale (clamping mu as scale_up does)
+    new_mu = np.clip(new_mu * RATIO + engine.mu, 0, 10000)
+    new_ratings = RatingArrays(new_mu, new_phi * RATIO, new_sigma)
+    if metrics is not None:
+        _lap(metrics, 'scaling', start)
+    return new_ratings
+
+
+def decay(engine, ratings, periods):
+    """Vectorized `Glicko2.decay` (equal up to the last ulp): brings
+    (mu, phi, sigma) arrays on the original scale up to date after
+    `periods` idle rating periods (an array, or one count for everyone).
+    Players with periods <= 0 are returned unchanged.
+
+    Returns:
+        RatingArrays: The decayed ratings.
+    """
+    mu = np.asarray(ratings[0], dtype=np.float64)
+    phi = np.asarray(ratings[1], dtype=np.float64)
+    sigma = np.asarray(ratings[2], dtype=np.float64)
+    periods = np.broadcast_to(np.asarray(periods), mu.shape)
+    idle = periods > 0
+
+    phi_g2 = phi / RATIO
+    new_phi = np.sqrt(phi_g2 ** 2 + np.where(idle, periods, 0) * sigma ** 2) * RATIO
+    # mu only goes through the scale round trip (and clamp), as in `rate`
+    new_mu = np.clip((mu - engine.mu) / RATIO * RATIO + engine.mu, 0, 10000)
+    return RatingArrays(np.where(idle, new_mu, mu), np.where(idle, new_phi, phi), sigma.copy())
+
+
+def _lap(metrics, stage, start):
+    """Charges the time since `start` to `stage`; returns the new start."""
+    now = perf_counter()
+    metrics.add_time(stage, now - start)
+    return now
+
+
+def _scaled_mu_impact(engine, ratings):
+    """Glicko-2 scale mu and g(phi) arrays from original-scale ratings."""
+    mu = (np.asarray(ratings[0], dtype=np.float64) - engine.mu) / RATIO
+    phi = np.asarray(ratings[1], dtype=np.float64) / RATIO
+    return mu, reduce_impact(phi)
+
+
+def _quality(expected_score1, expected_score2):
+    """`Glicko2.quality_1vs1` from both players' expected scores."""
+    expected_score_avg = (expected_score1 + (1.0 - expected_score2)) / 2.0
+    return 2 * (0.5 - np.abs(0.5 - expected_score_avg))
+
+
+def expected_score_blocks(engine, ratings, block_size=1024):
+    """Yields (first_row, block) pairs covering the N x N expected score
+    matrix, `block_size` rows at a time: entry [i, j] is the (clamped) E of
+    player i against player j, using j's g(phi) as `rate` does.
+
+    Args:
+        ratings (tuple): (mu, phi, sigma) arrays on the original scale.
+    """
+    mu, impact = _scaled_mu_impact(engine, ratings)
+    for start in range(0, len(mu), block_size):
+        rows = slice(start, start + block_size)
+        yield start, expect_score(mu[rows, None], mu[None, :], impact[None, :])
+
+
+def expected_score_matrix(engine, ratings, block_size=1024):
+    """N x N matrix of expected scores (see `expected_score_blocks`). The
+    result alone takes 8 * N**2 bytes; iterate over the blocks instead
+    when that is too much."""
+    n = len(ratings[0])
+    expected = np.empty((n, n))
+    for start, block in expected_score_blocks(engine, ratings, block_size):
+        expected[start:start + len(block)] = block
+    return expected
+
+
+def quality_blocks(engine, ratings, block_size=1024):
+    """Yields (first_row, block) pairs covering the N x N match quality
+    matrix, `block_size` rows at a time, so large pools never need the
+    whole matrix (or its transpose) in memory at once."""
+    mu, impact = _scaled_mu_impact(engine, ratings)
+    for start in range(0, len(mu), block_size):
+        rows = slice(start, start + block_size)
+        # [i, j]: i against j (j's impact), and j against i (i's impact)
+        expected_score1 = expect_score(mu[rows, None], mu[None, :], impact[None, :])
+        expected_score2 = expect_score(mu[None, :], mu[rows, None], impact[rows, None])
+        yield start, _quality(expected_score1, expected_score2)
+
+
+def quality_matrix(engine, ratings, block_size=1024):
+    """N x N matrix of `Glicko2.quality_1vs1` for every pair of players,
+    built block by block (see `quality_blocks`)."""
+    n = len(ratings[0])
+    quality = np.empty((n, n))
+    for start, block in quality_blocks(engine, ratings, block_size):
+        quality[start:start + len(block)] = block
+    return quality
+
+
+class OpponentFinder(object):
+    """Top-k "best opponents" queries without building the quality matrix.
+
+    Players are sorted by mu. A query scans outwards from the player's
+    position in growing windows and stops once no player outside the
+    window can beat the current k-th best quality. The bound uses the
+    smallest g(phi) in the pool: quality only drops as the rating gap grows
+    or as the opponent's g(phi) grows.
+
+    Args:
+        engine (Glicko2): Supplies the system parameters.
+        ratings (tuple): (mu, phi, sigma) arrays on the original scale.
+    """
+    def __init__(self, engine, ratings):
+        self.mu, self.impact = _scaled_mu_impact(engine, ratings)
+        self.order = np.argsort(self.mu, kind='stable')
+        self.sorted_mu = self.mu[self.order]
+        self.position = np.empty(len(self.mu), dtype=np.intp)
+        self.position[self.order] = np.arange(len(self.mu))
+        self.min_impact = self.impact.min() if len(self.mu) else 1.0
+
+    def quality(self, player, opponents):
+        """Match quality of `player` against each of `opponents` (indexes)."""
+        mu, impact = self.mu, self.impact
+        return _quality(expect_score(mu[player], mu[opponents], impact[opponents]),
+                        expect_score(mu[opponents], mu[player], impact[player]))
+
+    def _bound(self, player, gap):
+        """Highest quality any opponent at least `gap` away (in mu) can reach."""
+        return _quality(expect_score(gap, 0.0, self.min_impact),
+                        expect_score(0.0, gap, self.impact[player]))
+
+    def best(self, player, k=10):
+        """The k opponents with the highest match quality for `player`.
+
+        Returns:
+            tuple(ndarray, ndarray): (opponent indexes, qualities), best first.
+        """
+        n = len(self.mu)
+        k = min(k, n - 1)
+        if k <= 0:
+            return np.zeros(0, dtype=np.intp), np.zeros(0)
+        pos = self.position[player]
+        player_mu = self.mu[player]
+        width = max(k, 16)
+        while True:
+            lo, hi = max(0, pos - width), min(n, pos + width + 1)
+            candidates = self.order[lo:hi]
+            candidates = candidates[candidates != player]
+            quality = self.quality(player, candidates)
+            if len(candidates) > k:
+                top = np.argpartition(-quality, k - 1)[:k]
+            else:
+                top = np.arange(len(candidates))
+            if lo == 0 and hi == n:
+                break
+            if len(candidates) >= k:
+                # Everyone outside the window is at least `gap` away in mu
+                gap = np.inf
+                if lo > 0:
+                    gap = player_mu - self.sorted_mu[lo - 1]
+                if hi < n:
+                    gap = min(gap, self.sorted_mu[hi] - player_mu)
+                if quality[top].min() >= self._bound(player, gap):
+                    break
+            width *= 2
+        top = top[np.argsort(-quality[top], kind='stable')]
+        return candidates[top], quality[top]
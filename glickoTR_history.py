@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+    glickoTR_history
+    ~~~~~~~~~~~~~~~~
+
+    Compact per-player rating history with as-of queries.
+
+    Every player's history is a list of fixed-size chunks holding
+    (period, mu, phi, sigma) columns in `array` buffers (about 32 bytes an
+    entry, 20 with deltas) instead of one Rating object per entry. With
+    `deltas=True` each chunk keeps its first rating in float64 and the
+    rest as float32 offsets from it, which keeps every entry randomly
+    accessible and bounds the error by float32 rounding of the offset
+    (below 1e-3 rating points for offsets under 10000).
+
+    Periods are non-decreasing per player; several entries may share a
+    period (e.g. one per match), and queries return the last of them.
+    "As of period T" lookups bisect the chunk start periods and then the
+    chunk, so they cost O(log n). `max_entries` bounds the memory kept
+    per player by dropping whole chunks from the old end.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+from glickoTR import Rating
+
+# Entries per chunk
+CHUNK_SIZE = 256
+
+
+class _Chunk(object):
+    """Up to CHUNK_SIZE consecutive history entries of one player."""
+    __slots__ = ('periods', 'base', 'mu', 'phi', 'sigma')
+
+    def __init__(self, deltas, rating):
+        self.periods = array('q')
+        if deltas:
+            # float32 offsets from the chunk's first rating
+            self.base = (float(rating.mu), float(rating.phi), float(rating.sigma))
+            typecode = 'f'
+        else:
+            self.base = (0.0, 0.0, 0.0)
+            typecode = 'd'
+        self.mu = array(typecode)
+        self.phi = array(typecode)
+        self.sigma = array(typecode)
+
+    def __len__(self):
+        return len(self.periods)
+
+    def append(self, period, rating):
+        base_mu, base_phi, base_sigma = self.base
+        self.periods.append(period)
+        self.mu.append(rating.mu - base_mu)
+        self.phi.append(rating.phi - base_phi)
+        self.sigma.append(rating.sigma - base_sigma)
+
+    def get(self, index):
+        base_mu, base_phi, base_sigma = self.base
+        return Rating(base_mu + self.mu[index], base_phi + self.phi[index],
+                      base_sigma + self.sigma[index])
+
+    def nbytes(self):
+        return sum(len(column) * column.itemsize
+                   for column in (self.periods, self.mu, self.phi, self.sigma))
+
+
+class RatingHistory(object):
+    """Append-only rating history of many players.
+
+    Args:
+        deltas (bool): Store ratings as float32 offsets (see module docs).
+        chunk_size (int): Entries per chunk.
+        max_entries (int): Optional per-player limit; the oldest chunks are
+                           dropped once a player has at least this many
+                           newer entries.
+    """
+    def __init__(self, deltas=False, chunk_size=CHUNK_SIZE, max_entries=None):
+        self.deltas = deltas
+        self.chunk_size = chunk_size
+        self.max_entries = max_entries
+        # player_id -> list of _Chunk, oldest first
+        self._chunks = {}
+        # player_id -> first period of each chunk, for bisecting
+        self._starts = {}
+        # player_id -> number of stored entries
+        self._counts = {}
+
+    def __len__(self):
+        """Total number of stored entries."""
+        return sum(self._counts.values())
+
+    def players(self):
+        """Returns the ids of all players with history."""
+        return list(self._chunks)
+
+    def append(self, player_id, period, rating):
+        """Adds a player's rating as of `period` (not earlier than their
+        last entry)."""
+        chunks = self._chunks.get(player_id)
+        if chunks is None:
+            chunks = self._chunks[player_id] = []
+            self._starts[player_id] = array('q')
+            self._counts[player_id] = 0
+        elif period < chunks[-1].periods[-1]:
+            raise ValueError('period %d is before the last entry (%d) of player %r' %
+                             (period, chunks[-1].periods[-1], player_id))
+        if not chunks or len(chunks[-1]) >= self.chunk_size:
+            chunks.append(_Chunk(self.deltas, rating))
+            self._starts[player_id].append(period)
+        chunks[-1].append(period, rating)
+        self._counts[player_id] += 1
+        if self.max_entries is not None:
+            self._trim(player_id)
+
+    def record(self, period, ratings):
+        """Appends a whole period, e.g. the dict returned by
+        StreamingRater.close_period.
+
+        Args:
+            ratings (dict): {player_id: Rating}.
+        """
+        for player_id, rating in ratings.items():
+            self.append(player_id, period, rating)
+
+    def _trim(self, player_id):
+        chunks = self._chunks[player_id]
+        while len(chunks) > 1 and self._counts[player_id] - len(chunks[0]) >= self.max_entries:
+            self._counts[player_id] -= len(chunks.pop(0))
+            del self._starts[player_id][0]
+
+    def as_of(self, player_id, period):
+        """The player's last rating recorded at or before `period`, or None
+        if there is none (or it has been trimmed)."""
+        starts = self._starts.get(player_id)
+        if starts is None:
+            return None
+        index = bisect_right(starts, period) - 1
+        if index < 0:
+            return None
+        chunk = self._chunks[player_id][index]
+        return chunk.get(bisect_right(chunk.periods, period) - 1)
+
+    def as_of_all(self, period):
+        """Returns {player_id: Rating} as of `period` for every player with
+        an entry at or before it."""
+        ratings = {}
+        for player_id in self._chunks:
+            rating = self.as_of(player_id, period)
+            if rating is not None:
+                ratings[player_id] = rating
+        return ratings
+
+    def latest(self, player_id):
+        """The player's most recent rating, or None."""
+        chunks = self._chunks.get(player_id)
+        if not chunks:
+            return None
+        return chunks[-1].get(len(chunks[-1]) - 1)
+
+    def history(self, player_id, start=None, end=None):
+        """Yields (period, Rating) for the player's entries with
+        start <= period <= end (either bound may be None), in order."""
+        chunks = self._chunks.get(player_id, ())
+        first = 0
+        if start is not None and chunks:
+            # The first chunk that can hold `start` begins at or before it
+            first = max(0, bisect_left(self._starts[player_id], start) - 1)
+        for chunk in chunks[first:]:
+            if end is not None and chunk.periods[0] > end:
+                return
+            lo = 0 if start is None else bisect_left(chunk.periods, start)
+            hi = len(chunk) if end is None else bisect_right(chunk.periods, end)
+            for index in range(lo, hi):
+                yield chunk.periods[index], chunk.get(index)
+
+    def columns(self, player_id):
+        """The player's full history as (periods, mu, phi, sigma) arrays
+        (array('q') and array('d')), e.g. for plotting."""
+        periods, mu, phi, sigma = array('q'), array('d'), array('d'), array('d')
+        for chunk in self._chunks.get(player_id, ()):
+            periods.extend(chunk.periods)
+            base_mu, base_phi, base_sigma = chunk.base
+            mu.extend(base_mu + value for value in chunk.mu)
+            phi.extend(base_phi + value for value in chunk.phi)
+            sigma.extend(base_sigma + value for value in chunk.sigma)
+        return periods, mu, phi, sigma
+
+    def nbytes(self):
+        """Bytes held by the history buffers (excluding per-chunk overhead)."""
+        return sum(chunk.nbytes() for chunks in self._chunks.values() for chunk in chunks)
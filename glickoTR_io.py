@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+    glickoTR_io
+    ~~~~~~~~~~~
+
+    Bulk persistence for rating tables and match logs.
+
+    Snapshots are binary and columnar: a fixed 64 byte header followed by
+    little-endian columns (float64 mu/phi/sigma for ratings; int64 player
+    ids, int32 games and int8 status codes for matches). Loading maps the
+    file with numpy.memmap, so nothing is parsed and several reader
+    processes share the same pages.
+
+    JSON and CSV import/export stream row by row and never hold the whole
+    document in memory. Rating JSON uses the same shape as the
+    scenarioN_expected.json files: {"<id>": {"mu": .., "phi": .., "sigma": ..}}.
+"""
+import csv
+import json
+import struct
+import sys
+from array import array
+
+import numpy as np
+
+from glickoTR import Rating, RatingTable
+from glickoTR_batch import RatingArrays, MatchArrays, status_codes
+
+MAGIC = b'GTRSNAP\x00'
+VERSION = 1
+KIND_RATINGS = 1
+KIND_MATCHES = 2
+
+# magic, kind, version, row count, padding up to 64 bytes
+_HEADER = struct.Struct('<8sIIQ40x')
+
+_RATING_COLUMNS = (('mu', '<f8'), ('phi', '<f8'), ('sigma', '<f8'))
+_MATCH_COLUMNS = (('player', '<i8'), ('opponent', '<i8'), ('player_games', '<i4'),
+                  ('opponent_games', '<i4'), ('status', 'i1'))
+
+# Streaming chunk size: characters per JSON read, rows per status conversion
+CHUNK_SIZE = 1 << 16
+
+
+def _write_snapshot(path, kind, columns, layout):
+    count = len(columns[0])
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, kind, VERSION, count))
+        for values, (name, dtype) in zip(columns, layout):
+            if len(values) != count:
+                raise ValueError('column %r has %d rows, expected %d' % (name, len(values), count))
+            np.ascontiguousarray(values, dtype=dtype).tofile(f)
+
+
+def _map_snapshot(path, kind, layout, mode):
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError('%s: truncated snapshot header' % path)
+    magic, file_kind, version, count = _HEADER.unpack(header)
+    if magic != MAGIC or file_kind != kind:
+        raise ValueError('%s: not a glickoTR %s snapshot' %
+                         (path, 'ratings' if kind == KIND_RATINGS else 'matches'))
+    if version != VERSION:
+        raise ValueError('%s: unsupported snapshot version %d' % (path, version))
+    columns = []
+    offset = _HEADER.size
+    for name, dtype in layout:
+        if count:
+            columns.append(np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=(count,)))
+        else:
+            columns.append(np.zeros(0, dtype=dtype))
+        offset += count * np.dtype(dtype).itemsize
+    return columns
+
+
+def save_ratings(path, ratings):
+    """Writes a ratings snapshot from a RatingTable or (mu, phi, sigma)
+    arrays indexed by player id."""
+    if isinstance(ratings, RatingTable):
+        ratings = ratings.as_arrays()
+    _write_snapshot(path, KIND_RATINGS, tuple(ratings), _RATING_COLUMNS)
+
+
+def load_ratings(path, mode='r'):
+    """Maps a ratings snapshot without parsing it.
+
+    Args:
+        mode (str): numpy.memmap mode: 'r' (read-only, pages shared between
+                    processes), 'r+' (write through) or 'c' (copy-on-write).
+
+    Returns:
+        RatingArrays: Memory-mapped (mu, phi, sigma) columns, ready for
+        `Glicko2.rate_period`.
+    """
+    return RatingArrays(*_map_snapshot(path, KIND_RATINGS, _RATING_COLUMNS, mode))
+
+
+def load_rating_table(path):
+    """Loads a ratings snapshot into a RatingTable (a straight buffer copy)."""
+    table = RatingTable()
+    for column, values in zip((table.mu, table.phi, table.sigma), load_ratings(path)):
+        column.frombytes(values.tobytes())
+        if sys.byteorder == 'big':
+            column.byteswap()
+    return table
+
+
+def save_matches(path, matches):
+    """Writes a matches snapshot from a MatchLog or (player, opponent,
+    player_games, opponent_games, status) arrays."""
+    if hasattr(matches, 'as_match_arrays'):
+        matches = matches.as_match_arrays()
+    _write_snapshot(path, KIND_MATCHES, tuple(matches), _MATCH_COLUMNS)
+
+
+def load_matches(path, mode='r'):
+    """Maps a matches snapshot without parsing it (see `load_ratings`).
+
+    Returns:
+        MatchArrays: Memory-mapped columns, ready for `Glicko2.rate_period`.
+    """
+    return MatchArrays(*_map_snapshot(path, KIND_MATCHES, _MATCH_COLUMNS, mode))
+
+
+def create_matches(path, count):
+    """Creates a zero-filled matches snapshot of `count` rows and maps it
+    for writing, so large match sets can be filled in chunk by chunk.
+
+    Returns:
+        MatchArrays: Writable memory-mapped columns; call `flush()` on each
+        (or drop them) when done.
+    """
+    row_size = sum(np.dtype(dtype).itemsize for _, dtype in _MATCH_COLUMNS)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, KIND_MATCHES, VERSION, count))
+        f.truncate(_HEADER.size + count * row_size)
+    return load_matches(path, mode='r+')
+
+
+# Longest token a chunk boundary can cut in two without a decode error
+# ('-Infinity'); see _JSONStream.value
+_MAX_TOKEN = 9
+
+
+class _JSONStream(object):
+    """Pulls one JSON value at a time out of a file, refilling a bounded
+    buffer as needed."""
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Returns the next non-whitespace character ('' at end of file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('expected %r at offset %d' % (char, self.pos))
+        self.pos += 1
+
+    def _at_end(self, pos):
+        """Whether a token starting at `pos` may run past the buffer."""
+        return len(self.buf) - pos <= _MAX_TOKEN and not self.eof
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # Only a value cut off by the end of the buffer needs more
+                # data; anything else is an error in the document, raised
+                # without reading the rest of the file
+                if (self._at_end(e.pos) or e.msg.startswith('Unterminated string')) and \
+                        self._fill():
+                    continue
+                raise
+            # A number near the end of the buffer may be cut short (1. of 1.5)
+            if self._at_end(end) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """Yields the (key, value) pairs of a top-level object."""
+        self.expect('{')
+        if self.peek() == '}':
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key, self.value()
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect('}')
+                return
+
+    def elements(self):
+        """Yields the values of a top-level array."""
+        self.expect('[')
+        if self.peek() == ']':
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect(']')
+                return
+
+
+def iter_ratings_json(path, chunk_size=CHUNK_SIZE):
+    """Yields (player_id, Rating) from a ratings JSON object, one at a time,
+    reading `chunk_size` characters at a time."""
+    with open(path, encoding='utf-8') as f:
+        for player_id, row in _JSONStream(f, chunk_size).items():
+            yield player_id, Rating(row['mu'], row['phi'], row['sigma'])
+
+
+def write_ratings_json(path, rows):
+    """Writes (player_id, rating) pairs as a ratings JSON object, row by row."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        separator = '\n'
+        for player_id, rating in rows:
+            f.write('%s    %s: {"mu": %r, "phi": %r, "sigma": %r}' % (
+                separator, json.dumps(str(player_id)),
+                float(rating.mu), float(rating.phi), float(rating.sigma)))
+            separator = ',\n'
+        f.write('\n}\n')
+
+
+def iter_ratings_csv(path):
+    """Yields (player_id, Rating) from a player_id,mu,phi,sigma CSV file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield row['player_id'], Rating(float(row['mu']), float(row['phi']),
+                                           float(row['sigma']))
+
+
+def write_ratings_csv(path, rows):
+    """Writes (player_id, rating) pairs as a player_id,mu,phi,sigma CSV."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(('player_id', 'mu', 'phi', 'sigma'))
+        for player_id, rating in rows:
+            writer.writerow((player_id, repr(float(rating.mu)), repr(float(rating.phi)),
+                             repr(float(rating.sigma))))
+
+
+# Field names of match records in JSON/CSV, matching the notebook's results
+_MATCH_FIELDS = ('p1_id', 'p2_id', 'games1', 'games2', 'status')
+
+
+def iter_matches_json(path, chunk_size=CHUNK_SIZE):
+    """Yields (player1, player2, games1, games2, status) from a JSON array of
+    {"p1_id", "p2_id", "games1", "games2", "status"} objects, reading
+    `chunk_size` characters at a time."""
+    with open(path, encoding='utf-8') as f:
+        for row in _JSONStream(f, chunk_size).elements():
+            yield tuple(row[field] for field in _MATCH_FIELDS)
+
+
+def write_matches_json(path, matches):
+    """Writes (player1, player2, games1, games2, status) tuples as a JSON
+    array, row by row."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        separator = '\n'
+        for match in matches:
+            f.write(separator + '    ' + json.dumps(dict(zip(_MATCH_FIELDS, match))))
+            separator = ',\n'
+        f.write('\n]\n')
+
+
+def iter_matches_csv(path):
+    """Yields (player1, player2, games1, games2, status) from a CSV file with
+    a p1_id,p2_id,games1,games2,status header. Ids are parsed as ints."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield (int(row['p1_id']), int(row['p2_id']), int(row['games1']),
+                   int(row['games2']), row['status'])
+
+
+def write_matches_csv(path, matches):
+    """Writes (player1, player2, games1, games2, status) tuples as CSV."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(_MATCH_FIELDS)
+        writer.writerows(matches)
+
+
+def matches_to_snapshot(matches, path, chunk_size=CHUNK_SIZE):
+    """Converts an iterable of match tuples (e.g. `iter_matches_csv`) into a
+    matches snapshot, buffering only the binary columns."""
+    columns = (array('q'), array('q'), array('i'), array('i'))
+    codes = []
+    statuses = []
+    for player1, player2, games1, games2, status in matches:
+        for column, value in zip(columns, (player1, player2, games1, games2)):
+            column.append(value)
+        statuses.append(status)
+        # Convert status strings chunk by chunk to keep memory bounded
+        if len(statuses) >= chunk_size:
+            codes.append(status_codes(statuses))
+            statuses = []
+    codes.append(status_codes(statuses))
+    save_matches(path, columns + (np.concatenate(codes),))
+
+
+def ratings_to_snapshot(rows, path):
+    """Converts an iterable of (player_id, rating) pairs (e.g.
+    `iter_ratings_json`) into a ratings snapshot. Players are stored in
+    iteration order; returns the list of their ids (the snapshot index)."""
+    table = RatingTable()
+    player_ids = []
+    for player_id, rating in rows:
+        player_ids.append(player_id)
+        table.append(rating)
+    save_ratings(path, table)
+    return player_ids
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+    glickoTR_kernel
+    ~~~~~~~~~~~~~~~
+
+    Flattened float kernels for the per-player and per-match updates.
+
+    `rate_kernel` and `match_kernel` do the work of `Glicko2.rate` and
+    `Glicko2.rate_tennis_match` (scaling, g(phi), E, the accumulation, the
+    volatility solve and the update) as plain functions of floats and
+    float sequences: no Rating objects, no method calls or attribute
+    lookups on the hot path. In pure Python their results are identical to
+    the engine's.
+
+    The backend is chosen once, at import time. If Numba is importable,
+    the same kernels are compiled with numba.njit on first use (results
+    may then differ from the engine's by a few ulps, as LLVM's exp/log are
+    not libm's); otherwise the pure-Python
+    functions are used and importing this module costs nothing extra. Set
+    GLICKOTR_KERNEL=python to skip the JIT, or GLICKOTR_KERNEL=numba to
+    require it. `BACKEND` names the implementation in use.
+
+    The kernels bypass an engine's metrics and opponent cache.
+"""
+import math
+import os
+
+from glickoTR import RATIO, SCORE_CLAMP, MAX_TAU_FULL_BRACKET
+
+# Bracket search limit of the volatility solve (as in Glicko2._determine_sigma)
+MAX_K = 100
+
+# Clamped mu range on the original scale (as in Glicko2.scale_up)
+MIN_MU = 0.0
+MAX_MU = 10000.0
+
+
+def _volatility_f(x, phi_squared, variance, difference_squared, alpha, tau):
+    exp_x = math.exp(x)
+    tmp = phi_squared + variance + exp_x
+    if tmp < 1e-15:
+        return -1.0 / (tau ** 2)
+    a = exp_x * (difference_squared - phi_squared - variance - exp_x) / (2 * tmp ** 2)
+    b = (x - alpha) / (tau ** 2)
+    return a - b
+
+
+def sigma_kernel(phi, sigma, difference, variance, tau, epsilon):
+    """`Glicko2._determine_sigma` (Glicko-2 scale floats in, new sigma out)."""
+    phi_squared = phi ** 2
+    difference_squared = difference ** 2
+    alpha = math.log(sigma ** 2)
+    a = alpha
+    if difference_squared > phi_squared + variance:
+        b = math.log(difference_squared - phi_squared - variance)
+    else:
+        k = 1
+        if abs(tau) <= MAX_TAU_FULL_BRACKET and phi_squared + variance >= 1e-15:
+            # The search provably runs to MAX_K here
+            k = MAX_K
+        step = math.sqrt(tau ** 2)
+        while k < MAX_K and _volatility_f(alpha - k * step, phi_squared, variance,
+                                          difference_squared, alpha, tau) >= 0:
+            k += 1
+        b = alpha - k * step
+    f_a = _volatility_f(a, phi_squared, variance, difference_squared, alpha, tau)
+    f_b = _volatility_f(b, phi_squared, variance, difference_squared, alpha, tau)
+    if f_a * f_b >= 0:
+        return sigma
+    while abs(b - a) > epsilon:
+        c = a + (a - b) * f_a / (f_b - f_a)
+        f_c = _volatility_f(c, phi_squared, variance, difference_squared, alpha, tau)
+        if f_c == 0:
+            b = c
+            break
+        if f_c * f_b < 0:
+            a, f_a = b, f_b
+        else:
+            f_a *= f_b / (f_b + f_c)
+        b, f_b = c, f_c
+        if abs(f_b - f_a) < epsilon:
+            break
+    return math.exp(b / 2)
+
+
+def _update(mu, phi, sigma, variance_inv, difference, base_mu, tau, epsilon):
+    """Steps 5-8 from the weighted sums; Glicko-2 scale in, original out."""
+    if variance_inv < epsilon:
+        new_mu, new_phi, new_sigma = mu, math.sqrt(phi ** 2 + sigma ** 2), sigma
+    else:
+        variance = 1. / variance_inv
+        difference /= variance_inv
+        new_sigma = sigma_kernel(phi, sigma, difference, variance, tau, epsilon)
+        phi_star = math.sqrt(phi ** 2 + new_sigma ** 2)
+        new_phi = 1. / math.sqrt(1. / phi_star ** 2 + 1. / variance)
+        new_mu = mu + new_phi ** 2 * difference
+    new_mu = new_mu * RATIO + base_mu
+    new_mu = max(MIN_MU, min(new_mu, MAX_MU))
+    return new_mu, new_phi * RATIO, new_sigma
+
+
+def _expected(impact, mu_diff):
+    score = 1. / (1 + math.exp(-impact * mu_diff))
+    if score < SCORE_CLAMP:
+        return SCORE_CLAMP
+    if score > 1.0 - SCORE_CLAMP:
+        return 1.0 - SCORE_CLAMP
+    return score
+
+
+def rate_kernel(mu, phi, sigma, opponent_mu, opponent_phi, weights, player_games,
+                opponent_games, base_mu, tau, epsilon):
+    """`Glicko2.rate` on floats (original scale in and out).
+
+    Args:
+        mu, phi, sigma (float): The player's rating.
+        opponent_mu, opponent_phi, weights, player_games, opponent_games
+            (sequences of float): One entry per match of the series; the
+            weights come from `Glicko2.match_weight`.
+        base_mu, tau, epsilon (float): The engine's mu, tau and epsilon.
+
+    Returns:
+        tuple: (mu, phi, sigma) of the new rating.
+    """
+    mu = (mu - base_mu) / RATIO
+    phi = phi / RATIO
+    variance_inv = 0.0
+    difference = 0.0
+    for i in range(len(weights)):
+        weight = weights[i]
+        if weight <= 0:
+            continue
+        other_phi = opponent_phi[i] / RATIO
+        impact = 1. / math.sqrt(1 + (3 * other_phi ** 2) / (math.pi ** 2))
+        expected_score = _expected(impact, mu - (opponent_mu[i] - base_mu) / RATIO)
+        total_games = player_games[i] + opponent_games[i]
+        if total_games <= 0:
+            actual_score = 0.5
+        else:
+            actual_score = player_games[i] / total_games
+        variance_inv += weight * (impact ** 2 * expected_score * (1 - expected_score))
+        difference += weight * (impact * (actual_score - expected_score))
+    return _update(mu, phi, sigma, variance_inv, difference, base_mu, tau, epsilon)
+
+
+def match_kernel(mu1, phi1, sigma1, mu2, phi2, sigma2, weight, games1, games2,
+                 base_mu, tau, epsilon):
+    """`Glicko2.rate_tennis_match` on floats (original scale in and out).
+
+    Returns:
+        tuple: (mu1, phi1, sigma1, mu2, phi2, sigma2) after the match.
+    """
+    mu1 = (mu1 - base_mu) / RATIO
+    phi1 = phi1 / RATIO
+    mu2 = (mu2 - base_mu) / RATIO
+    phi2 = phi2 / RATIO
+    variance_inv1 = difference1 = variance_inv2 = difference2 = 0.0
+    if weight > 0:
+        total_games = games1 + games2
+        if total_games <= 0:
+            score1 = score2 = 0.5
+        else:
+            score1 = games1 / total_games
+            score2 = games2 / total_games
+        mu_diff = mu1 - mu2
+        impact2 = 1. / math.sqrt(1 + (3 * phi2 ** 2) / (math.pi ** 2))
+        expected1 = _expected(impact2, mu_diff)
+        impact1 = 1. / math.sqrt(1 + (3 * phi1 ** 2) / (math.pi ** 2))
+        expected2 = _expected(impact1, -mu_diff)
+        variance_inv1 = weight * (impact2 ** 2 * expected1 * (1 - expected1))
+        difference1 = weight * (impact2 * (score1 - expected1))
+        variance_inv2 = weight * (impact1 ** 2 * expected2 * (1 - expected2))
+        difference2 = weight * (impact1 * (score2 - expected2))
+    new_mu1, new_phi1, new_sigma1 = _update(mu1, phi1, sigma1, variance_inv1, difference1,
+                                            base_mu, tau, epsilon)
+    new_mu2, new_phi2, new_sigma2 = _update(mu2, phi2, sigma2, variance_inv2, difference2,
+                                            base_mu, tau, epsilon)
+    return new_mu1, new_phi1, new_sigma1, new_mu2, new_phi2, new_sigma2
+
+
+def _select_backend():
+    """Returns the backend name, wrapping the kernels for the JIT if one
+    is used."""
+    choice = os.environ.get('GLICKOTR_KERNEL', 'auto').lower()
+    if choice == 'python':
+        return 'python'
+    try:
+        import numba
+    except ImportError:
+        if choice == 'numba':
+            raise
+        return 'python'
+    jit = numba.njit(cache=True)
+    # Rebind in dependency order; callers are compiled lazily and pick up
+    # the compiled versions of these globals
+    globals().update((name, jit(globals()[name])) for name in (
+        '_volatility_f', 'sigma_kernel', '_update', '_expected', 'rate_kernel',
+        'match_kernel'))
+    return 'numba %s' % numba.__version__
+
+
+BACKEND = _select_backend()
+
+
+def _vector(values):
+    if BACKEND == 'python':
+        return values
+    import numpy as np
+    return np.array(values, dtype=np.float64)
+
+
+def rate(engine, rating, series):
+    """`engine.rate(rating, series)` through `rate_kernel`."""
+    weight = engine.match_weight
+    mu, phi, sigma = rate_kernel(
+        float(rating.mu), float(rating.phi), float(rating.sigma),
+        _vector([float(other.mu) for _, _, other, _ in series]),
+        _vector([float(other.phi) for _, _, other, _ in series]),
+        _vector([float(weight(status, player_games, opponent_games))
+                 for player_games, opponent_games, _, status in series]),
+        _vector([float(player_games) for player_games, _, _, _ in series]),
+        _vector([float(opponent_games) for _, opponent_games, _, _ in series]),
+        float(engine.mu), float(engine.tau), float(engine.epsilon))
+    return engine.create_rating(mu, phi, sigma)
+
+
+def rate_tennis_match(engine, rating1, rating2, games1, games2, status):
+    """`engine.rate_tennis_match(...)` through `match_kernel`."""
+    values = match_kernel(float(rating1.mu), float(rating1.phi), float(rating1.sigma),
+                          float(rating2.mu), float(rating2.phi), float(rating2.sigma),
+                          float(engine.match_weight(status, games1, games2)),
+                          float(games1), float(games2),
+                          float(engine.mu), float(engine.tau), float(engine.epsilon))
+    return (engine.create_rating(values[0], values[1], values[2]),
+            engine.create_rating(values[3], values[4], values[5]))
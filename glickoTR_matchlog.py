@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+    glickoTR_matchlog
+    ~~~~~~~~~~~~~~~~~
+
+    An indexed, append-only log of match results.
+
+    Matches are stored column-wise and numbered in the order they are
+    added, which is taken to be time order. Every player has an index of
+    their match ids and a bounded window of their most recent matches, so
+    building the `rate` series for a player never scans the whole log.
+"""
+from array import array
+from collections import deque
+
+from glickoTR import STATUS_CODES
+
+# Default size of the per-player rolling window
+WINDOW = 30
+
+
+class MatchLog(object):
+    """Append-only match store with per-player indexes and rolling windows.
+
+    Args:
+        window (int): Number of most recent matches kept per player for
+                      `series` (the notebook's rolling window).
+    """
+    def __init__(self, window=WINDOW):
+        self.window = window
+        # Match columns, indexed by match id
+        self.player1 = array('q')
+        self.player2 = array('q')
+        self.games1 = array('l')
+        self.games2 = array('l')
+        self.status = array('b')
+        # player_id -> match ids in time order (full history)
+        self._index = {}
+        # player_id -> the last `window` match ids
+        self._windows = {}
+
+    def __len__(self):
+        return len(self.player1)
+
+    def add(self, player1, player2, games1, games2, status):
+        """Appends a match result and returns its match id."""
+        match_id = len(self.player1)
+        self.player1.append(player1)
+        self.player2.append(player2)
+        self.games1.append(games1)
+        self.games2.append(games2)
+        # Unknown statuses are kept as -1, which rates with zero weight
+        self.status.append(STATUS_CODES.index(status) if status in STATUS_CODES else -1)
+        for player_id in (player1, player2):
+            matches = self._index.get(player_id)
+            if matches is None:
+                matches = self._index[player_id] = array('q')
+                self._windows[player_id] = deque(maxlen=self.window)
+            matches.append(match_id)
+            self._windows[player_id].append(match_id)
+        return match_id
+
+    def extend(self, matches):
+        """Appends an iterable of (player1, player2, games1, games2, status)."""
+        for match in matches:
+            self.add(*match)
+
+    def players(self):
+        """Ids of every player with at least one match."""
+        return self._index.keys()
+
+    def matches_of(self, player_id):
+        """All match ids of a player, in time order."""
+        return self._index.get(player_id, array('q'))
+
+    def recent(self, player_id):
+        """The player's last `window` match ids, in time order."""
+        return list(self._windows.get(player_id, ()))
+
+    def match(self, match_id):
+        """Returns (player1, player2, games1, games2, status) for a match."""
+        code = self.status[match_id]
+        return (self.player1[match_id], self.player2[match_id],
+                self.games1[match_id], self.games2[match_id],
+                STATUS_CODES[code] if code >= 0 else None)
+
+    def series(self, player_id, ratings, match_ids=None):
+        """Builds the `Glicko2.rate` series for a player from the index.
+
+        Args:
+            player_id: The player to build the series for.
+            ratings: Mapping of player id to start-of-period Rating, used
+                     for the opponents.
+            match_ids: The matches to include; defaults to the player's
+                       rolling window.
+
+        Returns:
+            list: (player_games, opponent_games, opponent_rating, status)
+            tuples in time order.
+        """
+        if match_ids is None:
+            match_ids = self._windows.get(player_id, ())
+        series = []
+        for match_id in match_ids:
+            code = self.status[match_id]
+            status = STATUS_CODES[code] if code >= 0 else None
+            if self.player1[match_id] == player_id:
+                series.append((self.games1[match_id], self.games2[match_id],
+                               ratings[self.player2[match_id]], status))
+            else:
+                series.append((self.games2[match_id], self.games1[match_id],
+                               ratings[self.player1[match_id]], status))
+        return series
+
+    def as_match_arrays(self):
+        """Zero-copy NumPy views of the match columns in the layout taken by
+        `Glicko2.rate_period`. Requires NumPy."""
+        import numpy as np
+        return (np.frombuffer(self.player1, dtype=np.int64),
+                np.frombuffer(self.player2, dtype=np.int64),
+                np.frombuffer(self.games1, dtype=np.dtype('l')),
+                np.frombuffer(self.games2, dtype=np.dtype('l')),
+                np.frombuffer(self.status, dtype=np.int8))
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+    glickoTR_metrics
+    ~~~~~~~~~~~~~~~~
+
+    Optional hot-path telemetry for the glickoTR engines.
+
+    A RatingMetrics attached to an engine (``Glicko2(metrics=...)`` or
+    ``env.metrics = ...``) collects, until the period is closed:
+
+    * counters: match terms seen (one per player per match, walkovers
+      included), expected scores clamped to the SCORE_CLAMP bounds,
+      `variance_inv < epsilon` early exits, volatility solves, bracket
+      searches, bracket searches that ran to max_k and `f_a * f_b >= 0`
+      fallbacks;
+    * a histogram of Illinois iterations per volatility solve;
+    * wall time per stage: scaling, accumulation, sigma and update.
+
+    With no metrics attached (the default) the engines only pay a `None`
+    check per call. To forward the numbers elsewhere, override `count`,
+    `observe_iterations` and `add_time`, or pass `on_period` to receive
+    every closed period's snapshot.
+"""
+
+COUNTERS = ('matches', 'clamped_scores', 'no_information', 'sigma_solves',
+            'bracket_searches', 'bracket_max_k', 'sigma_fallbacks')
+STAGES = ('scaling', 'accumulation', 'sigma', 'update')
+
+
+class RatingMetrics(object):
+    """Per-period counters, iteration histogram and stage timings.
+
+    Args:
+        on_period (callable): Optional callback, called by `close_period`
+                              with the period's snapshot.
+    """
+    def __init__(self, on_period=None):
+        self.on_period = on_period
+        self.reset()
+
+    def reset(self):
+        """Zeroes every counter, the histogram and the timings."""
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.iterations = {}
+        self.timings = dict.fromkeys(STAGES, 0.0)
+
+    def count(self, name, n=1):
+        """Adds `n` to a counter (one of COUNTERS)."""
+        self.counts[name] += n
+
+    def observe_iterations(self, steps, n=1):
+        """Records `n` volatility solves that took `steps` Illinois iterations."""
+        self.iterations[steps] = self.iterations.get(steps, 0) + n
+
+    def add_time(self, stage, seconds):
+        """Adds wall time to a stage (one of STAGES)."""
+        self.timings[stage] += seconds
+
+    def sigma_solved(self, iterations, bracket_steps, max_k, fallback):
+        """Records one scalar volatility solve.
+
+        Args:
+            iterations (int): Illinois iterations taken.
+            bracket_steps (int): Final k of the bracket search, 0 if the
+                                 search was not needed.
+            max_k (int): The bracket search limit.
+            fallback (bool): The `f_a * f_b >= 0` fallback kept the old sigma.
+        """
+        self.count('sigma_solves')
+        if bracket_steps:
+            self.count('bracket_searches')
+            if bracket_steps >= max_k:
+                self.count('bracket_max_k')
+        if fallback:
+            self.count('sigma_fallbacks')
+        else:
+            self.observe_iterations(iterations)
+
+    def snapshot(self):
+        """Returns the current numbers as a plain dict (copies): the
+        counters, plus 'iterations' ({steps: solves}) and 'timings'
+        ({stage: seconds})."""
+        snapshot = dict(self.counts)
+        snapshot['iterations'] = dict(self.iterations)
+        snapshot['timings'] = dict(self.timings)
+        return snapshot
+
+    def merge(self, snapshot):
+        """Adds a snapshot (e.g. from a worker process) into this one."""
+        for name in COUNTERS:
+            if snapshot[name]:
+                self.count(name, snapshot[name])
+        for steps, n in snapshot['iterations'].items():
+            self.observe_iterations(steps, n)
+        for stage in STAGES:
+            self.add_time(stage, snapshot['timings'][stage])
+
+    def close_period(self):
+        """Ends the period: returns its snapshot, hands it to `on_period`
+        (if set) and starts counting from zero."""
+        snapshot = self.snapshot()
+        self.reset()
+        if self.on_period is not None:
+            self.on_period(snapshot)
+        return snapshot
+
+    def __repr__(self):
+        args = ', '.join('%s=%d' % (name, self.counts[name]) for name in COUNTERS)
+        return '%s(%s)' % (type(self).__name__, args)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+    glickoTR_parallel
+    ~~~~~~~~~~~~~~~~~
+
+    Multi-core rating periods.
+
+    Within a period every player's update only depends on start-of-period
+    ratings, so players are sharded across a ProcessPoolExecutor. The
+    start-of-period ratings are written once into a shared memory block
+    that every worker maps, instead of being pickled with each task; tasks
+    only carry player ids and their series. Results are merged in player
+    id order, so the output does not depend on scheduling.
+
+    If the engine has metrics, each worker records into its own
+    RatingMetrics and the parent merges them shard by shard (worker
+    timings add up to CPU time, not wall time).
+"""
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from glickoTR import Rating, RatingTable
+from glickoTR_metrics import RatingMetrics
+
+# Shards per worker; more shards balance uneven series lengths better
+SHARDS_PER_WORKER = 4
+
+# Per-process state set up by _init_worker
+_worker = {}
+
+
+def _attach(engine, buf, size):
+    """Sets up the per-process rating columns over a shared buffer."""
+    values = buf.cast('d')
+    _worker['engine'] = engine
+    _worker['values'] = values
+    _worker['columns'] = (values[:size], values[size:2 * size], values[2 * size:3 * size])
+
+
+def _init_worker(engine, name, size):
+    shm = shared_memory.SharedMemory(name=name)
+    # Keep the mapping alive for the lifetime of the worker process
+    _worker['shm'] = shm
+    _attach(engine, shm.buf, size)
+
+
+def _rate_shard(shard):
+    """Rates one shard of (player_id, series) pairs against the shared
+    start-of-period ratings. Returns ([(player_id, mu, phi, sigma)],
+    metrics snapshot or None)."""
+    engine = _worker['engine']
+    mu, phi, sigma = _worker['columns']
+    # Opponents recur across a shard; convert each one only once
+    scaled = {}
+    results = []
+    for player_id, series in shard:
+        series_g2 = []
+        for player_games, opp_games, opponent_id, status in series:
+            other = scaled.get(opponent_id)
+            if other is None:
+                other = scaled[opponent_id] = engine.to_scaled(Rating(
+                    mu[opponent_id], phi[opponent_id], sigma[opponent_id]))
+            series_g2.append((player_games, opp_games, other, status))
+        player = engine.to_scaled(Rating(mu[player_id], phi[player_id], sigma[player_id]))
+        new = engine.from_scaled(engine.rate_scaled(player, series_g2))
+        results.append((player_id, new.mu, new.phi, new.sigma))
+    # Pool workers hand their metrics back to the parent with every shard
+    if 'shm' in _worker and engine.metrics is not None:
+        return results, engine.metrics.close_period()
+    return results, None
+
+
+def _shards(player_ids, series_by_player, count):
+    """Splits the sorted player ids into `count` contiguous shards."""
+    size = max(1, -(-len(player_ids) // count))
+    for start in range(0, len(player_ids), size):
+        yield [(player_id, series_by_player.get(player_id, ()))
+               for player_id in player_ids[start:start + size]]
+
+
+def rate_period_parallel(engine, ratings, series_by_player, workers=None):
+    """Rates every player for one period using a pool of processes.
+
+    Args:
+        engine (Glicko2): The rating engine; pickled once per worker.
+        ratings: Start-of-period ratings indexed by integer player id
+                 0..N-1 (a list of Ratings or a RatingTable).
+        series_by_player (dict): {player_id: series} where each series entry
+                 is (player_games, opponent_games, opponent_id, status) --
+                 like the `rate` series, but naming the opponent by id.
+                 Players without an entry only get RD inflation.
+        workers (int): Number of processes (default: os.cpu_count()).
+                 With 1 worker everything runs in the calling process.
+
+    Returns:
+        list: The new Rating of every player, indexed by player id.
+    """
+    size = len(ratings)
+    player_ids = list(range(size))
+    shm = shared_memory.SharedMemory(create=True, size=max(8, 3 * size * 8))
+    try:
+        values = shm.buf.cast('d')
+        if isinstance(ratings, RatingTable):
+            # Straight buffer copies, no boxing
+            values[:size] = memoryview(ratings.mu)
+            values[size:2 * size] = memoryview(ratings.phi)
+            values[2 * size:3 * size] = memoryview(ratings.sigma)
+        else:
+            for player_id in player_ids:
+                rating = ratings[player_id]
+                values[player_id] = rating.mu
+                values[size + player_id] = rating.phi
+                values[2 * size + player_id] = rating.sigma
+        values.release()
+
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            _attach(engine, shm.buf, size)
+            try:
+                results = [_rate_shard(shard) for shard in
+                           _shards(player_ids, series_by_player, 1)]
+            finally:
+                for column in _worker.pop('columns'):
+                    column.release()
+                _worker.pop('values').release()
+                _worker.clear()
+        else:
+            worker_engine = engine
+            if engine.metrics is not None:
+                # Workers get a fresh, picklable recorder of their own
+                worker_engine = copy.copy(engine)
+                worker_engine.metrics = RatingMetrics()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(worker_engine, shm.name, size)) as executor:
+                # map() yields shard results in submission (player id) order
+                results = list(executor.map(_rate_shard, _shards(
+                    player_ids, series_by_player, workers * SHARDS_PER_WORKER)))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    new_ratings = [None] * size
+    for shard, snapshot in results:
+        if snapshot is not None:
+            engine.metrics.merge(snapshot)
+        for player_id, mu, phi, sigma in shard:
+            new_ratings[player_id] = engine.create_rating(mu, phi, sigma)
+    return new_ratings
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+    glickoTR_replay
+    ~~~~~~~~~~~~~~~
+
+    Re-rating of a whole, time-ordered match archive, with checkpoints.
+
+    A Replay drives one or more engines (parameter configurations, e.g. a
+    tau or retirement weighting sweep) over the archive period by period
+    with the vectorized `Glicko2.rate_period`. Every period's matches are
+    sliced out once and rated by all configurations, so a sweep shares the
+    loading and slicing cost. Periods without matches only decay RD, in
+    one closed-form step per gap (`glickoTR_batch.decay`).
+
+    Every `checkpoint_every` periods the full rating table of each
+    configuration is checkpointed (in memory, or as ratings snapshots in
+    `checkpoint_dir`). Adding late matches or correcting one only
+    invalidates the checkpoints after its period; the next `run` resumes
+    from the nearest checkpoint before it instead of from the start.
+
+    Player ids are integers 0..N-1 indexing the initial rating arrays.
+"""
+import os
+
+import numpy as np
+
+from glickoTR_batch import RatingArrays, MatchArrays, decay, status_codes
+
+# Default distance between checkpoints, in periods
+CHECKPOINT_EVERY = 10
+
+
+class Replay(object):
+    """Re-rates a match archive for several engines in one pass.
+
+    Args:
+        engines (list): Glicko2 engines, one per parameter configuration.
+        ratings (tuple): (mu, phi, sigma) arrays on the original scale, the
+                         ratings of every player before the archive starts.
+        periods (sequence): The rating period of every match (integers).
+        matches (tuple): (player, opponent, player_games, opponent_games,
+                         status) arrays, as taken by `Glicko2.rate_period`.
+        checkpoint_every (int): Periods between checkpoints.
+        checkpoint_dir (str): Optional directory for checkpoint snapshots;
+                              checkpoints are kept in memory otherwise.
+        start_period (int): The first period (default: the earliest match).
+    """
+    def __init__(self, engines, ratings, periods, matches, checkpoint_every=CHECKPOINT_EVERY,
+                 checkpoint_dir=None, start_period=None):
+        self.engines = list(engines)
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_dir = checkpoint_dir
+        initial = RatingArrays(*(np.array(column, dtype=np.float64) for column in ratings))
+        self.players = len(initial.mu)
+        self._set_matches(np.asarray(periods, dtype=np.int64),
+                          MatchArrays(*(np.asarray(column) for column in matches)))
+        if start_period is None:
+            start_period = int(self.periods[0]) if len(self.periods) else 0
+        elif len(self.periods) and self.periods[0] < start_period:
+            raise ValueError('matches before start period %d' % start_period)
+        self.start_period = start_period
+        # period -> per-engine ratings at the start of that period (or
+        # snapshot paths); the start of the archive is always there
+        self._checkpoints = {}
+        self._save_checkpoint(start_period, [initial] * len(self.engines))
+
+    @classmethod
+    def from_rows(cls, engines, ratings, rows, **kwargs):
+        """Builds a Replay from (period, player1, player2, games1, games2,
+        status) tuples, with status strings (e.g. from a CSV export)."""
+        rows = list(rows)
+        columns = list(zip(*rows)) if rows else [()] * 6
+        matches = (np.array(columns[1], dtype=np.int64), np.array(columns[2], dtype=np.int64),
+                   np.array(columns[3], dtype=np.int32), np.array(columns[4], dtype=np.int32),
+                   status_codes(columns[5]))
+        return cls(engines, ratings, columns[0], matches, **kwargs)
+
+    @property
+    def end_period(self):
+        """The period after the last match: `run` rates up to here."""
+        return max(self.start_period, int(self.periods[-1]) + 1 if len(self.periods) else 0)
+
+    @property
+    def checkpoints(self):
+        """The periods with a valid checkpoint, in order."""
+        return sorted(self._checkpoints)
+
+    def _set_matches(self, periods, matches):
+        if len(periods) != len(matches.player):
+            raise ValueError('%d periods for %d matches' % (len(periods), len(matches.player)))
+        if len(periods) and max(matches.player.max(), matches.opponent.max()) >= self.players:
+            raise ValueError('player ids must be below %d' % self.players)
+        if np.any(np.diff(periods) < 0):
+            # Keep same-period matches in their given order
+            order = np.argsort(periods, kind='stable')
+            periods = periods[order]
+            matches = MatchArrays(*(column[order] for column in matches))
+        self.periods = periods
+        self.matches = matches
+
+    def _checkpoint_path(self, period, config):
+        return os.path.join(self.checkpoint_dir, 'replay-%d-%d.snap' % (config, period))
+
+    def _save_checkpoint(self, period, states):
+        if self.checkpoint_dir is None:
+            self._checkpoints[period] = list(states)
+            return
+        from glickoTR_io import save_ratings
+        paths = []
+        for config, state in enumerate(states):
+            paths.append(self._checkpoint_path(period, config))
+            save_ratings(paths[-1], state)
+        self._checkpoints[period] = paths
+
+    def _load_checkpoint(self, period):
+        states = self._checkpoints[period]
+        if self.checkpoint_dir is None:
+            return list(states)
+        from glickoTR_io import load_ratings
+        return [load_ratings(path) for path in states]
+
+    def _invalidate(self, period):
+        """Drops the checkpoints that depend on matches of `period`."""
+        for checkpoint in [p for p in self._checkpoints if p > period]:
+            paths = self._checkpoints.pop(checkpoint)
+            if self.checkpoint_dir is not None:
+                for path in paths:
+                    os.remove(path)
+
+    def add_matches(self, periods, matches):
+        """Adds late-arriving matches (same layout as the constructor).
+        They are placed after the existing matches of their period."""
+        periods = np.asarray(periods, dtype=np.int64)
+        if not len(periods):
+            return
+        if periods.min() < self.start_period:
+            raise ValueError('matches before start period %d' % self.start_period)
+        self._set_matches(np.concatenate((self.periods, periods)),
+                          MatchArrays(*(np.concatenate((old, np.asarray(new, dtype=old.dtype)))
+                                        for old, new in zip(self.matches, matches))))
+        self._invalidate(int(periods.min()))
+
+    def replace_match(self, index, period, match):
+        """Corrects match `index` (in period order) to `match`, a
+        (player, opponent, player_games, opponent_games, status code) tuple
+        played in `period`."""
+        if period < self.start_period:
+            raise ValueError('period %d is before start period %d' % (period, self.start_period))
+        changed = min(int(self.periods[index]), period)
+        periods = self.periods.copy()
+        periods[index] = period
+        columns = [column.copy() for column in self.matches]
+        for column, value in zip(columns, match):
+            column[index] = value
+        self._set_matches(periods, MatchArrays(*columns))
+        self._invalidate(changed)
+
+    def _next_checkpoint(self, period):
+        done = (period - self.start_period) // self.checkpoint_every + 1
+        return self.start_period + done * self.checkpoint_every
+
+    def run(self, until=None):
+        """Rates every configuration up to the start of period `until`
+        (default: `end_period`), resuming from the nearest checkpoint.
+
+        Returns:
+            list: RatingArrays per engine, in `engines` order.
+        """
+        if until is None:
+            until = self.end_period
+        if until < self.start_period:
+            raise ValueError('period %d is before start period %d' % (until, self.start_period))
+        period = max(p for p in self._checkpoints if p <= until)
+        states = self._load_checkpoint(period)
+        while period < until:
+            lo = np.searchsorted(self.periods, period, 'left')
+            hi = np.searchsorted(self.periods, period, 'right')
+            if lo == hi:
+                # No matches: decay everyone up to the next match, checkpoint or stop
+                stop = min(until, self._next_checkpoint(period))
+                if lo < len(self.periods):
+                    stop = min(stop, int(self.periods[lo]))
+                states = [decay(engine, state, stop - period)
+                          for engine, state in zip(self.engines, states)]
+                period = stop
+            else:
+                matches = MatchArrays(*(column[lo:hi] for column in self.matches))
+                states = [engine.rate_period(state, matches)
+                          for engine, state in zip(self.engines, states)]
+                period += 1
+            if (period - self.start_period) % self.checkpoint_every == 0 and \
+                    period not in self._checkpoints:
+                self._save_checkpoint(period, states)
+        return states
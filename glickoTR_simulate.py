@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+    glickoTR_simulate
+    ~~~~~~~~~~~~~~~~~
+
+    Synthetic tournament match streams, generated with NumPy.
+
+    The simulation notebook's model, vectorized: uniformly random pairings
+    of distinct players, winners drawn from the engine's expected score
+    (and decided outright beyond a DECISIVE_GAP rating gap), a
+    completed/retired/walkover status mix and the notebook's game scores
+    (12-30 games for completed matches, 1-17 for retirements, the winner
+    taking 50.1-95% of them; walkovers have no games). Outcomes come from
+    fixed "true" ratings, so a stream can be generated before any of it
+    is rated.
+
+    Matches come out as MatchArrays, the input of `Glicko2.rate_period`,
+    never as Python objects. They are generated in fixed blocks of
+    BLOCK_SIZE, each from its own seeded generator, so a seed always
+    produces the same stream, whatever the chunk size and whichever
+    part of it is asked for.
+"""
+import numpy as np
+
+from glickoTR import RATIO
+from glickoTR_batch import (MatchArrays, RatingArrays, STATUS_COMPLETED, STATUS_RETIRED,
+                            reduce_impact, expect_score)
+
+# Rating gap (original scale) beyond which the stronger player always wins
+DECISIVE_GAP = 350.0
+
+# Probabilities of COMPLETED, RETIRED and WALKOVER (the notebook's mix)
+STATUS_MIX = (0.9, 0.1, 0.0)
+
+# Matches per independently seeded block
+BLOCK_SIZE = 1 << 14
+
+# Default matches per chunk (a multiple of BLOCK_SIZE)
+CHUNK_SIZE = 1 << 16
+
+
+def population(engine, players, seed=0, spread=200.0, phi=(50.0, 350.0)):
+    """Draws a population like the notebook's: mu normal around the
+    engine's default, phi uniform in the `phi` range, default sigma.
+
+    Returns:
+        RatingArrays: (mu, phi, sigma) float64 arrays indexed by player id.
+    """
+    rng = np.random.default_rng(seed)
+    return RatingArrays(rng.normal(engine.mu, spread, players),
+                        rng.uniform(phi[0], phi[1], players),
+                        np.full(players, float(engine.sigma)))
+
+
+class Simulator(object):
+    """Generates matches between the players of a rating table.
+
+    Args:
+        engine (Glicko2): The engine whose expected score decides winners.
+        ratings (tuple): (mu, phi, sigma) arrays on the original scale, the
+                         players' true strengths.
+        seed (int): Seed of the stream.
+        status_mix (tuple): Probabilities of COMPLETED, RETIRED, WALKOVER.
+        decisive_gap (float): See DECISIVE_GAP.
+    """
+    def __init__(self, engine, ratings, seed=0, status_mix=STATUS_MIX,
+                 decisive_gap=DECISIVE_GAP):
+        mu = np.asarray(ratings[0], dtype=np.float64)
+        if len(mu) < 2:
+            raise ValueError('at least two players are needed, got %d' % len(mu))
+        mix = np.asarray(status_mix, dtype=np.float64)
+        if len(mix) != 3 or np.any(mix < 0) or mix.sum() <= 0:
+            raise ValueError('status_mix must be three non-negative weights')
+        self.players = len(mu)
+        self.seed = seed
+        self.decisive_gap = decisive_gap
+        self._mu = mu
+        self._mu_g2 = (mu - engine.mu) / RATIO
+        self._impact = reduce_impact(np.asarray(ratings[1], dtype=np.float64) / RATIO)
+        self._mix = np.cumsum(mix / mix.sum())
+
+    def _block(self, index):
+        """Generates block `index` of the stream."""
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(index,)))
+        size = BLOCK_SIZE
+        player = rng.integers(0, self.players, size)
+        # Draw from the other players only
+        opponent = rng.integers(0, self.players - 1, size)
+        opponent += opponent >= player
+
+        gap = self._mu[player] - self._mu[opponent]
+        expected = expect_score(self._mu_g2[player], self._mu_g2[opponent],
+                                self._impact[opponent])
+        player_wins = np.where(np.abs(gap) > self.decisive_gap, gap > 0,
+                               rng.random(size) < expected)
+
+        status = np.searchsorted(self._mix, rng.random(size), 'right').astype(np.int8)
+        # Guards against the cumulative sum ending a rounding error below 1
+        np.minimum(status, len(self._mix) - 1, out=status)
+        total = np.where(status == STATUS_COMPLETED, rng.integers(12, 31, size),
+                         np.where(status == STATUS_RETIRED, rng.integers(1, 18, size), 0))
+        # A share above one half always gives the winner more games
+        winner = np.ceil(total * rng.uniform(0.501, 0.95, size)).astype(np.int32)
+        loser = total.astype(np.int32) - winner
+        return MatchArrays(player, opponent, np.where(player_wins, winner, loser),
+                           np.where(player_wins, loser, winner), status)
+
+    def matches(self, count, start=0):
+        """Returns matches start..start+count-1 of the stream.
+
+        Returns:
+            MatchArrays: (player, opponent, player_games, opponent_games,
+            status) columns, ready for `Glicko2.rate_period`.
+        """
+        stop = start + count
+        parts = []
+        for index in range(start // BLOCK_SIZE, -(-stop // BLOCK_SIZE)):
+            offset = index * BLOCK_SIZE
+            block = self._block(index)
+            lo, hi = max(start - offset, 0), min(stop - offset, BLOCK_SIZE)
+            parts.append([column[lo:hi] for column in block])
+        if not parts:
+            return MatchArrays(np.zeros(0, np.int64), np.zeros(0, np.int64),
+                               np.zeros(0, np.int32), np.zeros(0, np.int32),
+                               np.zeros(0, np.int8))
+        return MatchArrays(*(np.concatenate(columns) for columns in zip(*parts)))
+
+    def chunks(self, count, chunk_size=CHUNK_SIZE, start=0):
+        """Yields the stream's next `count` matches as MatchArrays of up to
+        `chunk_size` rows; only one chunk is held at a time."""
+        for offset in range(start, start + count, chunk_size):
+            yield self.matches(min(chunk_size, start + count - offset), offset)
+
+    def to_snapshot(self, path, count, chunk_size=CHUNK_SIZE):
+        """Writes `count` matches to a matches snapshot (see glickoTR_io)
+        chunk by chunk, so memory use is bounded by the chunk size."""
+        from glickoTR_io import create_matches
+        columns = create_matches(path, count)
+        offset = 0
+        for chunk in self.chunks(count, chunk_size):
+            for column, values in zip(columns, chunk):
+                column[offset:offset + len(values)] = values
+            offset += len(chunk.player)
+        for column in columns:
+            if hasattr(column, 'flush'):
+                column.flush()
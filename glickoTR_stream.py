@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+    glickoTR_stream
+    ~~~~~~~~~~~~~~~
+
+    Incremental rating of a live match feed.
+
+    A StreamingRater accepts matches one at a time. Each match adds its
+    weighted 1/v and Delta terms to the running sums of both players, using
+    their ratings from the start of the period, so a "rating right now"
+    query never replays the series. Closing the period finalizes the
+    players who played through the usual volatility solve and starts the
+    next one.
+
+    Inactive players are decayed lazily: each player's rating is stored
+    with the period it is the start rating of, and the RD inflation of the
+    idle periods since is applied in closed form (`Glicko2.decay`) only
+    when the player is read or plays again. Closing a period therefore
+    costs O(active players), however many players are known.
+"""
+
+
+class StreamingRater(object):
+    """Rates a stream of matches within rating periods.
+
+    Provisional ratings are exactly what `Glicko2.rate` would return for
+    the player's matches received so far in the period (for players back
+    from idle periods, up to the rounding of `Glicko2.decay`).
+
+    Args:
+        engine (Glicko2): The rating engine (parameters and math).
+        ratings (dict): Optional {player_id: Rating} at the start of the
+                        first period. Players first seen in `add_match`
+                        get engine defaults.
+    """
+    def __init__(self, engine, ratings=None):
+        self.engine = engine
+        # Number of closed periods
+        self.period = 0
+        # Stored ratings on the Glicko-2 scale, and the period each one is
+        # the start rating of (one after the player's last active period)
+        self._scaled = {}
+        self._since = {}
+        # Running [variance_inv, difference] sums of players with matches
+        self._sums = {}
+        self.matches = 0
+        if ratings:
+            for player_id, rating in ratings.items():
+                self.add_player(player_id, rating)
+
+    def add_player(self, player_id, rating=None):
+        """Registers a player (with engine defaults if no rating is given)."""
+        if rating is None:
+            rating = self.engine.create_rating()
+        self._scaled[player_id] = self.engine.to_scaled(rating)
+        self._since[player_id] = self.period
+
+    def __len__(self):
+        return len(self._scaled)
+
+    def _player(self, player_id, register=True):
+        """The player's start-of-period ScaledRating, applying any pending
+        idle-period decay. Unknown players get engine defaults, and are
+        only registered if `register` is true (reads leave them out)."""
+        scaled = self._scaled.get(player_id)
+        if scaled is None:
+            if not register:
+                return self.engine.to_scaled(self.engine.create_rating())
+            self.add_player(player_id)
+            return self._scaled[player_id]
+        idle = self.period - self._since[player_id]
+        if idle:
+            scaled = self._scaled[player_id] = self.engine.to_scaled(
+                self.engine.decay(self.engine.from_scaled(scaled), idle))
+            self._since[player_id] = self.period
+        return scaled
+
+    def add_match(self, player1, player2, games1, games2, status):
+        """Adds one match result to the current period in O(1)."""
+        variance_inv1, difference1, variance_inv2, difference2 = self.engine.match_terms_scaled(
+            self._player(player1), self._player(player2), games1, games2, status)
+        for player_id, variance_inv, difference in ((player1, variance_inv1, difference1),
+                                                    (player2, variance_inv2, difference2)):
+            sums = self._sums.get(player_id)
+            if sums is None:
+                self._sums[player_id] = [variance_inv, difference]
+            else:
+                sums[0] += variance_inv
+                sums[1] += difference
+        self.matches += 1
+
+    def feed(self, matches):
+        """Consumes an iterable (e.g. a generator) of
+        (player1, player2, games1, games2, status) tuples.
+
+        Returns:
+            int: The number of matches consumed.
+        """
+        count = 0
+        for player1, player2, games1, games2, status in matches:
+            self.add_match(player1, player2, games1, games2, status)
+            count += 1
+        return count
+
+    def _finalize(self, player_id, record=True):
+        scaled = self._player(player_id, register=record)
+        variance_inv, difference = self._sums.get(player_id, (0, 0))
+        return self.engine.update_scaled(scaled, variance_inv, difference, record)
+
+    def provisional(self, player_id):
+        """The player's rating if the period closed now (original scale).
+        Queries are not counted in the engine's metrics, and unknown
+        players are not registered."""
+        return self.engine.from_scaled(self._finalize(player_id, record=False))
+
+    def start_rating(self, player_id):
+        """The player's rating at the start of the current period (engine
+        defaults for unknown players, who are not registered)."""
+        return self.engine.from_scaled(self._player(player_id, register=False))
+
+    def ratings(self):
+        """Yields (player_id, start-of-period Rating) for every known
+        player, bringing idle players up to date on the way."""
+        for player_id in list(self._scaled):
+            yield player_id, self.start_rating(player_id)
+
+    def close_period(self):
+        """Finalizes the players who played and starts a new period. The
+        engine's period is closed too (see `Glicko2.close_period`).
+
+        Returns:
+            dict: {player_id: Rating} for the new period, for the players
+            with matches in the closed one. Everyone else only has their RD
+            inflated, which is applied lazily (see `start_rating` and
+            `ratings`).
+        """
+        new_ratings = {}
+        next_period = self.period + 1
+        for player_id in self._sums:
+            rating = self.engine.from_scaled(self._finalize(player_id))
+            new_ratings[player_id] = rating
+            # Carry the clamped, original-scale rating into the next period,
+            # exactly as a caller chaining `rate` calls would
+            self._scaled[player_id] = self.engine.to_scaled(rating)
+            self._since[player_id] = next_period
+        self.period = next_period
+        self._sums = {}
+        self.matches = 0
+        self.engine.close_period()
+        return new_ratings